@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from functools import wraps
+
+from flask import jsonify, make_response
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are only counted per process
+    fcntl = None
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionControl:
+    # Caps the batch work (exports, group generation, imports) so check-ins
+    # and edits keep their CPU share. At most `slots` batch requests run at a
+    # time, shared between all worker processes via flock()ed slot files;
+    # up to `max_queue` more wait (per process) for up to `queue_timeout`
+    # seconds, everything beyond that is answered with 503 + Retry-After.
+    # Interactive routes aren't touched.
+
+    def __init__(self, slots, max_queue=8, queue_timeout=30, retry_after=15, lock_dir=None, name="batch"):
+        self.slots = max(1, slots)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.lock_dir = lock_dir
+        self.name = name
+        self._local = threading.BoundedSemaphore(self.slots)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._stats = {"admitted": 0, "rejected": 0, "running": 0}
+        if lock_dir and fcntl is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def _slot_path(self, i):
+        return os.path.join(self.lock_dir, f"{self.name}-slot-{i}.lock")
+
+    def _try_file_slot(self):
+        # fd of a free slot file (locked), None if all are taken
+        for i in range(self.slots):
+            fd = os.open(self._slot_path(i), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def acquire(self, timeout=None):
+        # Returns a token for release(); raises Overloaded when the queue is
+        # full or the slot doesn't free up in time. timeout=None waits forever
+        # (background jobs), without counting against the queue.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        queued = False
+        with self._lock:
+            if timeout is not None:
+                if self._waiting >= self.max_queue:
+                    self._stats["rejected"] += 1
+                    raise Overloaded()
+                self._waiting += 1
+                queued = True
+        try:
+            if not self._local.acquire(timeout=timeout):
+                raise Overloaded()
+            fd = None
+            if self.lock_dir and fcntl is not None:
+                # other processes may hold the remaining slots: poll with backoff
+                delay = 0.05
+                fd = self._try_file_slot()
+                while fd is None:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        self._local.release()
+                        raise Overloaded()
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+                    fd = self._try_file_slot()
+        except Overloaded:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise
+        finally:
+            if queued:
+                with self._lock:
+                    self._waiting -= 1
+        with self._lock:
+            self._stats["admitted"] += 1
+            self._stats["running"] += 1
+        return fd
+
+    def release(self, token):
+        if token is not None:
+            os.close(token)  # releases the flock
+        self._local.release()
+        with self._lock:
+            self._stats["running"] -= 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, waiting=self._waiting, slots=self.slots)
+
+    def overloaded_response(self):
+        response = jsonify({"error": "Der Server ist ausgelastet. Bitte später erneut versuchen."})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(self.retry_after)
+        return response
+
+    def batch(self, view):
+        # Route decorator. The slot is held until the response is closed, so
+        # streamed downloads count until their last byte.
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                token = self.acquire(timeout=self.queue_timeout)
+            except Overloaded:
+                return self.overloaded_response()
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                self.release(token)
+                raise
+            if response.direct_passthrough:
+                # file responses (send_file) skip call_on_close, the server
+                # closes the body iterable instead
+                response.response = ClosingIterator(response.response, lambda: self.release(token))
+            else:
+                response.call_on_close(lambda: self.release(token))
+            return response
+        return wrapper
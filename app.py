@@ -1,17 +1,30 @@
 import os
 import csv
 from flask import Flask, render_template, request, jsonify, send_file, Response, after_this_request
-from datetime import datetime
+from datetime import datetime, timedelta
 import threading
-from io import BytesIO
+import uuid
+import io
+import itertools
+from functools import partial
 import zipfile
-from pypdf import PdfReader, PdfWriter
-from report_generator import generate_report
+from zip_stream import stream_zip, dir_members
+from report_pool import ReportPool
+from report_cache import ReportCache
+from export_jobs import ExportJobs
+from admission import AdmissionControl, Overloaded
+from storage import CsvStorage, LOG_HEADER
+from sqlite_storage import SqliteStorage
+from lock_manager import LockManager
+from group_cache import GroupCache, roster_members
+from presence import PresenceMap
+from presence_hub import PresenceHub
+from server import serve_production
 import shutil
 import time
+import argparse
 
 app = Flask(__name__)
-lock = threading.Lock()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -20,50 +33,82 @@ GROUPS_DIR = os.path.join(DATA_DIR, "groups")
 LOG_FILE_DIR =  os.path.join(DATA_DIR, "log")
 ASV_PATH =  os.path.join(DATA_DIR, "asv-data.csv")
 TEMP_DIR =  os.path.join(DATA_DIR, "temp")
+TIMESLOTS_PATH = os.path.join(BASE_DIR, "static", "timeslots.txt")
+LOCK_DIR = os.path.join(DATA_DIR, "locks")
+JOURNAL_DIR = os.path.join(DATA_DIR, "journal")
+INDEX_DIR = os.path.join(DATA_DIR, "index")
+PRESENCE_FEED_PATH = os.path.join(DATA_DIR, "presence", "feed")  # feed.0, feed.1, ...
+REPORT_CACHE_DIR = os.path.join(DATA_DIR, "cache", "reports")
+EXPORT_JOBS_DIR = os.path.join(DATA_DIR, "exports")
+SQLITE_PATH = os.path.join(DATA_DIR, "presence.db")
+SQLITE_EXPORT_DIR = os.path.join(DATA_DIR, "cache", "logs")  # CSV logs materialized for exports
+
+# "csv": one log file per person (data/log), "sqlite": one database
+# (data/presence.db), existing logs are imported with migrate_to_sqlite.py
+STORAGE_BACKEND = "csv"
+EDIT_PAGE_SIZE = 50  # entries per page on /edit-all
+EVENTS_PAGE_SIZE = 100  # entries per page of /api/events
+EVENTS_MAX_DAYS = 366  # longest time range of one /api/events query
+REPORT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # processes for PDF generation in total (split across --workers)
+REPORT_TIMEOUT = 120  # seconds per report
+REPORT_CHART_BACKEND = "reportlab"  # "matplotlib" for the legacy raster charts
+REPORT_WARMUP_DELAY = 5  # seconds after start before --warmup loads the report workers
+REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # cached PDFs, least recently used are dropped first
+ZIP_LEVEL = 6  # deflate level of zip exports (1 fast ... 9 small), "store" = uncompressed
+ZIP_WORKERS = os.cpu_count() or 1  # threads compressing archive members
+EXPORT_JOB_WORKERS = 2  # background exports running at the same time (per process)
+EXPORT_RETENTION = 30 * 60  # seconds a finished export stays downloadable
+# batch work (exports, group generation, imports) may use at most this many
+# slots at a time, over all worker processes; check-ins are never throttled
+BATCH_SLOTS = max(1, (os.cpu_count() or 2) // 2)
+BATCH_QUEUE = 8  # batch requests waiting for a slot (per process), more get 503
+BATCH_QUEUE_TIMEOUT = 30  # seconds a batch request waits for a slot
+BATCH_RETRY_AFTER = 15  # Retry-After (seconds) of the 503
+PRESENCE_MAX_CLIENTS = 500  # open live connections of check-in pages (per process)
+PRESENCE_QUEUE_SIZE = 256  # changes buffered per connection before it's dropped as too slow
+PRESENCE_HEARTBEAT = 15  # seconds between keep-alive comments on idle connections
+PRESENCE_POLL_INTERVAL = 0.5  # seconds between looks at changes made by other worker processes
+
+if STORAGE_BACKEND == "sqlite":
+    storage = SqliteStorage(SQLITE_PATH, SQLITE_EXPORT_DIR)
+else:
+    storage = CsvStorage(LOG_FILE_DIR, JOURNAL_DIR, LOCK_DIR, INDEX_DIR)
+# thread + flock() locks, safe with several worker processes
+group_locks = LockManager(stripes=1, lock_dir=LOCK_DIR, name="groups")
+group_cache = GroupCache(GROUPS_DIR, group_locks)
+# newest status of every person, shared between the worker processes via a feed
+presence = PresenceMap(PRESENCE_FEED_PATH, os.path.join(LOCK_DIR, "presence-feed.lock"), storage.last_entries)
+presence_hub = PresenceHub(presence, PRESENCE_MAX_CLIENTS, PRESENCE_QUEUE_SIZE, PRESENCE_HEARTBEAT, PRESENCE_POLL_INTERVAL)
+report_pool = ReportPool(REPORT_WORKERS, REPORT_TIMEOUT)
+report_cache = ReportCache(REPORT_CACHE_DIR, TIMESLOTS_PATH, max_bytes=REPORT_CACHE_MAX_BYTES)
+export_jobs = ExportJobs(EXPORT_JOBS_DIR, workers=EXPORT_JOB_WORKERS, retention=EXPORT_RETENTION)
+admission = AdmissionControl(BATCH_SLOTS, BATCH_QUEUE, BATCH_QUEUE_TIMEOUT, BATCH_RETRY_AFTER, lock_dir=LOCK_DIR)
 
 REQUIRED_HEADERS_ASV = {"Klasse", "Familienname", "Rufname", "lokales Differenzierungsmerkmal"}
 REQUIRED_HEADERS_GROUPCSV = {"id", "lastname", "firstname"}
 
 
 def read_group_list():
-    return [file[:-4] for file in os.listdir(GROUPS_DIR) if file.endswith(".csv")]
+    return group_cache.group_list()
 
 
 def read_group_members(filename):
-    path = os.path.join(GROUPS_DIR, filename + ".csv")
-    members = []
-    with open(path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            members.append(
-                {
-                    "id": row.get("id", ""),
-                    "firstname": row.get("firstname", ""),
-                    "lastname": row.get("lastname", ""),
-                }
-            )
-    return members
+    return group_cache.members(filename)[0]
 
 
 def generate_zip(dir):
-    memory_file = BytesIO()
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for foldername, subfolders, filenames in os.walk(dir):
-            if not filenames and not subfolders: # empty folders
-                #print(f"Adding {foldername} to ZIP archive") # TODO: sse-connection
-                zf.write(foldername, os.path.relpath(foldername, dir) + '/')
-            for filename in filenames: # files
-                file_path = os.path.join(foldername, filename)
-                #print(f"Adding {file_path} to ZIP archive") # TODO: sse-connection
-                zf.write(file_path, os.path.relpath(file_path, dir))
-    
-    memory_file.seek(0)
-    return memory_file
+    # streamed, members are compressed in parallel
+    return stream_zip(dir_members(dir), ZIP_LEVEL, ZIP_WORKERS)
+
+def zip_response(chunks, zip_filename):
+    # send a generated zip as download while it's being written
+    response = Response(chunks, mimetype='application/zip')
+    response.headers.set("Content-Disposition", "attachment", filename=zip_filename)
+    return response
 
 @app.route("/")
 def index():
     groups = read_group_list()
-    groups.sort(key=str.lower)
     return render_template("index.html", groups=groups)
 
 
@@ -73,8 +118,13 @@ def get_members():
     if not group:
         return jsonify({"error": "Keine Gruppe angegeben"}), 400
     try:
-        members = read_group_members(group)
-        return jsonify({"members": members})
+        members, etag = group_cache.members(group)
+        # clients send the ETag of their cached roster (POST isn't cached by browsers)
+        if etag in request.if_none_match:
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+        response = jsonify({"members": members})
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -90,49 +140,78 @@ def submit_action():
     if not (initials and group and people and action):
         return jsonify({"error": "Unvollständige Angaben", "initials": initials, "group": group, "people": people, "action":action}), 400
 
-    with lock:
-        os.makedirs(LOG_FILE_DIR, exist_ok=True)
-        
-        for person in people:
-            person_id = person["id"]
-            log_file = os.path.join(LOG_FILE_DIR, f"{person_id}.csv")
-            
-            # Create a new CSV file with header if it doesn't exist.
-            if not os.path.exists(log_file):
-                with open(log_file, "w", newline="", encoding="utf-8") as f_out:
-                    csv.writer(f_out).writerow(
-                        [
-                            "initials",
-                            "group",
-                            "id",
-                            "lastname",
-                            "firstname",
-                            "status",
-                            "timestamp",
-                        ]
-                    )
-        
-        
-        # Add new entry to log-file
-        with open(log_file, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            for person in people:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                writer.writerow(
-                    [
-                        initials,
-                        group,
-                        person["id"],
-                        person["lastname"],
-                        person["firstname"],
-                        action,
-                        timestamp,
-                    ]
-                )
+    # Route each person's row to their own log file
+    rows = []
+    for person in people:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((
+            person["id"],
+            [
+                initials,
+                group,
+                person["id"],
+                person["lastname"],
+                person["firstname"],
+                action,
+                timestamp,
+            ],
+        ))
+    storage.append(rows)
+    publish_presence([(person_id, dict(zip(LOG_HEADER, values))) for person_id, values in rows])
 
     return jsonify({"status": "OK", "action": action, "people": people})
 
 
+def publish_presence(changes):
+    # the entries are already stored: a failing feed must not fail the request
+    try:
+        presence.publish(changes)
+    except Exception as e:
+        print(f"[Presence Warning] {e}")
+
+
+@app.route("/api/presence", methods=["GET"])
+def presence_of_group():
+    # Newest status of every member of a group, from memory
+    group = request.args.get("group")
+    if not group:
+        return jsonify({"error": "Keine Gruppe angegeben"}), 400
+    try:
+        members, _ = group_cache.members(group)
+    except FileNotFoundError:
+        return jsonify({"error": f"Gruppe {group} nicht gefunden"}), 404
+    return jsonify({"presence": presence.get(member["id"] for member in members)})
+
+
+@app.route("/api/presence/events", methods=["GET"])
+def presence_events():
+    # Live presence changes of a group's members (server-sent events)
+    group = request.args.get("group")
+    if not group:
+        return jsonify({"error": "Keine Gruppe angegeben"}), 400
+    try:
+        members, _ = group_cache.members(group)
+    except FileNotFoundError:
+        return jsonify({"error": f"Gruppe {group} nicht gefunden"}), 404
+
+    subscriber = presence_hub.subscribe(group, {member["id"] for member in members})
+    if subscriber is None:
+        response = jsonify({"error": "Zu viele offene Verbindungen. Bitte später erneut versuchen."})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(PRESENCE_HEARTBEAT)
+        return response
+    response = Response(presence_hub.stream(subscriber), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # also runs if the stream was never started
+    response.call_on_close(lambda: presence_hub.unsubscribe(subscriber))
+    return response
+
+
+@app.route("/api/presence-stats", methods=["GET"])
+def presence_stats():
+    return jsonify(presence_hub.stats())
+
+
 @app.route("/edit")
 def edit():
     id = request.args.get("id")
@@ -143,19 +222,15 @@ def edit():
     today = datetime.now().date()
     entries = []
     
-    log_file = os.path.join(LOG_FILE_DIR, f"{id}.csv")
-    
-    if os.path.exists(log_file):
-        with lock:
-            with open(log_file, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        row_date = datetime.fromisoformat(row["timestamp"]).date()
-                        if row_date == today:
-                            entries.append(row)
-                    except ValueError:
-                        continue  # ignore rows with invalid timestamps
+    if storage.exists(id):
+        # only today's entries are read
+        for row in storage.read_days(id, {today.isoformat()}):
+            try:
+                row_date = datetime.fromisoformat(row["timestamp"]).date()
+                if row_date == today:
+                    entries.append(row)
+            except ValueError:
+                continue  # ignore rows with invalid timestamps
         entries.reverse()
     return render_template(
         "edit.html", title="Einträge des heutigen Tages von", entries=entries, id=id
@@ -170,28 +245,78 @@ def edit_all():
         return "Fehlender Parameter (id)", 400
 
     entries = []
+    next_page = None
     
-    log_file = os.path.join(LOG_FILE_DIR, f"{id}.csv")
-    
-    if os.path.exists(log_file):
-        with lock:
-            with open(log_file, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        entries.append(row)
-                    except ValueError:
-                        continue  # ignore rows with invalid timestamps
-        entries.reverse()
+    if storage.exists(id):
+        # newest entries first, further pages are loaded by edit.js
+        entries, next_page = storage.read_page(id, EDIT_PAGE_SIZE)
     return render_template(
         "edit.html",
         title="Alle Einträge von",
         entries=entries,
         id=id,
         show_edit_all_link=False,
+        next_page=next_page,
     )
 
 
+@app.route("/api/entries", methods=["GET"])
+def entries_page():
+    id = request.args.get("id")
+    if not id:
+        return jsonify({"error": "Fehlender Parameter (id)"}), 400
+
+    try:
+        limit = min(max(int(request.args.get("limit", EDIT_PAGE_SIZE)), 1), 500)
+        skip = int(request.args.get("skip", 0))
+    except ValueError:
+        return jsonify({"error": "Ungültige Parameter"}), 400
+    before = request.args.get("before") or None
+
+    if not storage.exists(id):
+        return jsonify({"entries": [], "next": None})
+
+    entries, next_page = storage.read_page(id, limit, before=before, skip=skip)
+    return jsonify({"entries": entries, "next": next_page})
+
+
+def parse_query_time(value, end=False):
+    # "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]" -> timestamp string; a date as
+    # end includes the whole day
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@app.route("/api/events", methods=["GET"])
+def events_query():
+    # Entries of all students in a time range, e.g.
+    # /api/events?from=2026-10-12 09:40&to=2026-10-12 10:25&group=5a&status=ausgetreten
+    if not (request.args.get("from") and request.args.get("to")):
+        return jsonify({"error": "Fehlende Parameter (from, to)"}), 400
+    try:
+        start = parse_query_time(request.args["from"])
+        end = parse_query_time(request.args["to"], end=True)
+        limit = min(max(int(request.args.get("limit", EVENTS_PAGE_SIZE)), 1), 1000)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "Ungültige Parameter"}), 400
+    if end <= start:
+        return jsonify({"events": [], "next": None})
+    if (datetime.fromisoformat(end) - datetime.fromisoformat(start)).days >= EVENTS_MAX_DAYS:
+        return jsonify({"error": f"Der Zeitraum darf höchstens {EVENTS_MAX_DAYS} Tage umfassen."}), 400
+
+    events, next_offset = storage.query_events(
+        start, end,
+        group=request.args.get("group") or None,
+        initials=request.args.get("initials") or None,
+        status=request.args.get("status") or None,
+        limit=limit, offset=offset,
+    )
+    return jsonify({"events": events, "next": next_offset})
+
+
 # ---------- Eintrag löschen ----------
 @app.route("/api/delete_entry", methods=["POST"])
 def delete_entry():
@@ -201,38 +326,12 @@ def delete_entry():
     if not person_id:
         return jsonify({"error": "Ungültige ID"}), 400
 
-    log_file = os.path.join(LOG_FILE_DIR, f"{person_id}.csv")
-    
-    if not os.path.exists(log_file):
+    if not storage.exists(person_id):
         return jsonify({"error": f"Keine Einträge zu {person_id} gefunden."}), 404
 
-    removed = False
-    with lock:
-        with open(log_file, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            fld = reader.fieldnames
-
-        # keep all rows except the one that matches *totally*
-        new_rows = []
-        for row in rows:
-            if (
-                row["initials"] == target["initials"]
-                and row["group"] == target["group"]
-                and row["lastname"] == target["lastname"]
-                and row["firstname"] == target["firstname"]
-                and row["status"] == target["status"]
-                and row["timestamp"] == target["timestamp"]
-            ):
-                removed = True
-                continue
-            new_rows.append(row)
-
-        if removed:
-            with open(log_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fld)
-                writer.writeheader()
-                writer.writerows(new_rows)
+    removed = storage.delete(person_id, target)
+    if removed:
+        publish_presence([(person_id, storage.last_entry(person_id))])
 
     return jsonify({"removed": removed})
 
@@ -248,42 +347,27 @@ def update_entry():
     if not person_id:
         return jsonify({"error": "Ungültige ID"}), 400
 
-    log_file = os.path.join(LOG_FILE_DIR, f"{person_id}.csv")
-
-    if not os.path.exists(log_file):
+    if not storage.exists(person_id):
         return jsonify({"error": "Keine Einträge gefunden"}), 404
     
-    updated = False
-    with lock:
-        with open(log_file, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            fld = reader.fieldnames
-
-        for row in rows:
-            if (
-                row["initials"] == orig["initials"]
-                and row["group"] == orig["group"]
-                and row["lastname"] == orig["lastname"]
-                and row["firstname"] == orig["firstname"]
-                and row["status"] == orig["status"]
-                and row["timestamp"] == orig["timestamp"]
-            ):
-                row["status"] = new["status"]
-                row["timestamp"] = new["timestamp"]
-                updated = True
-                break
-
-        rows.sort(key=lambda x: x["timestamp"])
-
-        if updated:
-            with open(log_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fld)
-                writer.writeheader()
-                writer.writerows(rows)
+    updated = storage.update(person_id, orig, new)
+    if updated:
+        publish_presence([(person_id, storage.last_entry(person_id))])
 
     return jsonify({"updated": updated})
 
+@app.route("/api/lock-stats", methods=["GET"])
+def lock_stats():
+    return jsonify(storage.lock_stats(reset=request.args.get("reset") == "true"))
+
+@app.route("/api/admission-stats", methods=["GET"])
+def admission_stats():
+    return jsonify(admission.stats())
+
+@app.route("/api/report-cache-stats", methods=["GET"])
+def report_cache_stats():
+    return jsonify(report_cache.stats())
+
 @app.route("/admin")
 def admin():
     def check_auth(username, password):
@@ -308,22 +392,24 @@ def admin():
     return render_template("admin.html")
 
 @app.route("/api/export-logs", methods=["GET"])
+@admission.batch
 def export_logs():    
-    zip_file = generate_zip(LOG_FILE_DIR)
+    zip_file = stream_zip(storage.archive_members(), ZIP_LEVEL, ZIP_WORKERS)
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     zip_filename = f"logs_{timestamp}.zip"
     # send zip-file as download
-    return send_file(zip_file, mimetype='application/zip', as_attachment=True, download_name=zip_filename)
+    return zip_response(zip_file, zip_filename)
 
 @app.route("/api/export-groups", methods=["GET"])
+@admission.batch
 def export_groups():    
     zip_file = generate_zip(GROUPS_DIR)
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     zip_filename = f"groups_{timestamp}.zip"
     # send zip-file as download
-    return send_file(zip_file, mimetype='application/zip', as_attachment=True, download_name=zip_filename)
+    return zip_response(zip_file, zip_filename)
 
 @app.route("/api/export-asv", methods=["GET"])
 def export_asv():
@@ -345,10 +431,13 @@ def delete_log():
     confirm = request.json.get('confirm')
     if confirm == True:
         try:
-            for filename in os.listdir(LOG_FILE_DIR):
-                file_path = os.path.join(LOG_FILE_DIR, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
+            storage.delete_all()
+            presence.clear()
+            if os.path.isdir(REPORT_CACHE_DIR):
+                for filename in os.listdir(REPORT_CACHE_DIR):
+                    file_path = os.path.join(REPORT_CACHE_DIR, filename)
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
             return "Log-Dateien wurden gelöscht.", 200
         except Exception as e:
             return f"Fehler beim Löschen der Log-Dateien: {str(e)}", 500
@@ -356,6 +445,7 @@ def delete_log():
     return "Bestätigung fehlgeschlagen. Log-Dateien wurden NICHT gelöscht.", 400
 
 @app.route("/api/import-asv", methods=["POST"])
+@admission.batch
 def import_asv():
     if 'confirm' not in request.form or request.form['confirm'] != 'true':
         return jsonify({"error": "Bestätigung fehlgeschlagen. ASV-Datei wurde NICHT importiert."}), 400
@@ -368,10 +458,14 @@ def import_asv():
     if file.filename == '':
         return jsonify({"error": "Keine Datei ausgewählt."}), 400
         
-    file.save(ASV_PATH)
+    # temp file + rename: a running group generation keeps reading the old file
+    tmp_path = f"{ASV_PATH}.{uuid.uuid4().hex}.tmp"
+    file.save(tmp_path)
+    os.replace(tmp_path, ASV_PATH)
     return jsonify({"message": "ASV-Datei erfolgreich importiert."}), 200
 
 @app.route("/api/generate-groups", methods=["POST"])
+@admission.batch
 def generate_group():
     ### helper ###
     def cls_to_filename(cls_str: str) -> str:
@@ -381,16 +475,14 @@ def generate_group():
             cls_str = '0' + cls_str
         return f"{cls_str}.csv"
 
-    def ensure_file_with_header(path: str) -> None:
-        # Create a new CSV file with header if it doesn't exist
-        if not os.path.exists(path):
-            with open(path, "w", newline="", encoding="utf-8") as f_out:
-                csv.writer(f_out).writerow(["id", "lastname", "firstname"])
     ### helper ###
     
     confirm = request.json.get('confirm')
     if confirm == True:
-        os.makedirs(GROUPS_DIR, exist_ok=True)
+        # build the new groups next to the old ones, readers keep seeing the
+        # old set until the finished one is swapped in
+        staging = group_cache.staging_dir()
+        writers = {}  # filename -> (file, csv writer), one per class
         try:
             with open(ASV_PATH, newline="", encoding="utf-8-sig") as f_in:
                 reader = csv.DictReader(f_in, delimiter=";")
@@ -399,33 +491,35 @@ def generate_group():
                 if missing:
                     raise RuntimeError(f"Fehlende Spalten: {', '.join(missing)} in ASV-Datei")
                 
-                # delete old groups
-                for filename in os.listdir(GROUPS_DIR):
-                    file_path = os.path.join(GROUPS_DIR, filename)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                
                 # add new groups
                 for row in reader:
                     filename = cls_to_filename(row["Klasse"])
-                    filepath = os.path.join(GROUPS_DIR, filename)
-                    ensure_file_with_header(filepath)
-
-                    with open(filepath, "a", newline="", encoding="utf-8") as f_out:
-                        csv.writer(f_out, delimiter=",").writerow([
-                            row["lokales Differenzierungsmerkmal"],
-                            row["Familienname"],
-                            row["Rufname"]
-                        ])
+                    if filename not in writers:
+                        f_out = open(os.path.join(staging, filename), "w", newline="", encoding="utf-8", buffering=1 << 16)
+                        writers[filename] = (f_out, csv.writer(f_out, delimiter=","))
+                        writers[filename][1].writerow(["id", "lastname", "firstname"])
+                    writers[filename][1].writerow([
+                        row["lokales Differenzierungsmerkmal"],
+                        row["Familienname"],
+                        row["Rufname"]
+                    ])
+            for f_out, _ in writers.values():
+                f_out.close()
+            group_cache.swap(staging)
             return "Gruppen wurden erfolgreich aktualisiert.", 200
         except ValueError as ve:
             return str(ve), 400
         except RuntimeError as re:
             return str(re), 400
+        finally:
+            for f_out, _ in writers.values():
+                f_out.close()
+            group_cache.discard(staging)  # no-op after a successful swap
 
     return "Bestätigung fehlgeschlagen. Gruppen wurden NICHT aktualisiert.", 400
 
 @app.route("/api/import-groups", methods=["POST"])
+@admission.batch
 def import_groups():
     if 'confirm' not in request.form or request.form['confirm'] != 'true':
         return jsonify({"error": "Bestätigung fehlgeschlagen. ASV-Datei wurde NICHT importiert."}), 400
@@ -437,68 +531,75 @@ def import_groups():
     if not files:
         return jsonify({"error": "Keine Dateien ausgewählt."}), 40
 
-    # Header-validation
-    for file in files:
-        if not file.filename.endswith('.csv'):
-            return jsonify({"error": f"Ungültiges Dateiformat: {file.filename}"}), 400
+    # Header-validation on the first line only, then spool into the staging
+    # directory; the roster is parsed on the way for the cache
+    staging = group_cache.staging_dir()
+    rosters = {}
+    try:
+        for file in files:
+            if not file.filename.endswith('.csv'):
+                return jsonify({"error": f"Ungültiges Dateiformat: {file.filename}"}), 400
 
-        try:
-            content = file.stream.read().decode("utf-8").splitlines()
-            reader = csv.reader(content)
-            headers = next(reader)
-            header_set = set(h.strip() for h in headers)
-
-            if not REQUIRED_HEADERS_GROUPCSV.issubset(header_set):
-                return jsonify({
-                    "error": f"Datei '{file.filename}' fehlt mindestens ein Pflicht-Header. "
-                             f"Erwartet: {REQUIRED_HEADERS_GROUPCSV}, gefunden: {header_set}"
-                }), 400
-
-            file.stream.seek(0)  # Reset für das Speichern
-        except Exception as e:
-            return jsonify({"error": f"Fehler beim Verarbeiten von {file.filename}: {str(e)}"}), 400
+            filename = os.path.basename(file.filename)
+            try:
+                text = io.TextIOWrapper(file.stream, encoding="utf-8", newline="")
+                first_line = text.readline()
+                headers = next(csv.reader([first_line]), [])
+                header_set = set(h.strip() for h in headers)
+
+                if not REQUIRED_HEADERS_GROUPCSV.issubset(header_set):
+                    return jsonify({
+                        "error": f"Datei '{file.filename}' fehlt mindestens ein Pflicht-Header. "
+                                 f"Erwartet: {REQUIRED_HEADERS_GROUPCSV}, gefunden: {header_set}"
+                    }), 400
+
+                with open(os.path.join(staging, filename), "w", newline="", encoding="utf-8") as f_out:
+                    def spooled(lines):
+                        for line in lines:
+                            f_out.write(line)
+                            yield line
+                    rows = csv.DictReader(spooled(itertools.chain([first_line], text)))
+                    rosters[filename[:-4]] = roster_members(rows)
+            except Exception as e:
+                return jsonify({"error": f"Fehler beim Verarbeiten von {file.filename}: {str(e)}"}), 400
+
+        # replace all groups at once, the check-in page never sees an empty list
+        group_cache.swap(staging, rosters)
+    finally:
+        group_cache.discard(staging)  # no-op after a successful swap
 
-    # delete old groups
-    for filename in os.listdir(GROUPS_DIR):
-        file_path = os.path.join(GROUPS_DIR, filename)
-        if os.path.isfile(file_path):
-            os.remove(file_path)
     # delete ASV-file to avoid inconsistencies between the ASV-file and the group-data. 
-    os.remove(ASV_PATH)
-    
-    # add new groups
-    for file in files:
-        filepath = os.path.join(GROUPS_DIR, file.filename)
-        file.save(filepath)
+    if os.path.exists(ASV_PATH):
+        os.remove(ASV_PATH)
 
     return jsonify({"message": f"{len(files)} Gruppen-Dateien erfolgreich importiert."}), 200
 
 @app.route("/export", methods=["GET"])
 def export():
     groups = read_group_list()
-    groups.sort(key=str.lower)
     selected_group = request.args.get("selectedGroup")
     return render_template("export.html", groups=groups, selected_group=selected_group)
 
 @app.route("/api/exportPDF-person", methods=["GET"])
+@admission.batch
 def exportPDF_person():
     person_id = request.args.get('id')
     if not person_id:
         return "Missing 'id' parameter", 400
 
-    csv_path = os.path.join(LOG_FILE_DIR, person_id + ".csv")
     try:
-        pdf_response = generate_report(csv_path)
+        csv_path = storage.csv_path(person_id)
+        pdf_response = report_cache.generate([{"input_csv_path": csv_path, "chart_backend": REPORT_CHART_BACKEND}], report_pool.generate, TEMP_DIR)[0]
         if not pdf_response["status"] == "OK":
             return "PDF creation failed", 500
 
         pdf_path = pdf_response["pdf_path"]
         filename = pdf_response.get("filename", "report")
-        temp_dir = os.path.dirname(pdf_path)  # <--- dynamic extraction
 
         @after_this_request
-        def cleanup_temp_dir(response):
-            delayed_cleanup(temp_dir)  # temp_dir = os.path.dirname(pdf_path)
+        def cleanup_temp_file(response):
+            # only the file: the worker's temp dir is shared with its other reports
+            delayed_cleanup(pdf_path)
             return response
 
         return send_file(pdf_path, as_attachment=True, download_name=f"{filename}.pdf")
@@ -506,7 +607,78 @@ def exportPDF_person():
     except Exception as e:
         return f"Error during PDF creation: {str(e)}", 500
 
+def build_report_export(group, selected, file_type, progress=None):
+    # PDF ("PDF": one combined document, "ZIP": one full report per student).
+    # Returns (path, download_name); progress(done, total, message) per student.
+    total = len(selected)
+    tasks = []
+    export_filenames = []
+    for entry in selected:
+        person_id = entry["id"]
+        lastname = entry.get("lastname", "")
+        firstname = entry.get("firstname", "")
+        csv_path = storage.csv_path(person_id)
+        
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        export_filenames.append(f"{group}_{lastname}_{firstname}_{timestamp}")
+        tasks.append({
+            "input_csv_path": csv_path,
+            "firstname": firstname,
+            "lastname": lastname,
+            "full_report": file_type == "ZIP",
+            "chart_backend": REPORT_CHART_BACKEND,
+        })
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    if file_type == "PDF":
+        # one document with a section per student, built in a single pass
+        if progress:
+            progress(0, total, "Gesamt-PDF wird erstellt")
+        output_filename = f"PDF-Auswertungen_{timestamp}.pdf"
+        group_task = {"tasks": tasks, "title": f"Auswertungen {group}", "chart_backend": REPORT_CHART_BACKEND}
+        pdf_response = report_cache.generate([group_task], partial(report_pool.generate, func="generate_group_report"), TEMP_DIR)[0]
+        if pdf_response["status"] != "OK":
+            raise FileNotFoundError("Keine PDFs zum Verpacken gefunden")
+        if progress:
+            progress(total, total, "Gesamt-PDF erstellt")
+        return pdf_response["pdf_path"], output_filename
+
+    done = 0
+
+    def on_result(index, result):
+        nonlocal done
+        done += 1
+        if progress:
+            entry = selected[index]
+            progress(done, total, f"{entry.get('lastname', '')}, {entry.get('firstname', '')}")
+
+    # unchanged reports come from the cache, the rest is rendered in
+    # parallel; results come back in the selected order
+    results = report_cache.generate(tasks, report_pool.generate, TEMP_DIR, progress=on_result)
+    members = [(pdf_response["pdf_path"], f"{export_filename}.pdf")
+               for export_filename, pdf_response in zip(export_filenames, results)
+               if pdf_response["status"] == "OK"]  # skip pdf failures
+    if not members:
+        raise FileNotFoundError("Keine PDFs zum Verpacken gefunden")
+
+    output_filename = f"PDF-Auswertungen_{timestamp}.zip"
+    # unique temp name, concurrent exports of the same group can't collide
+    output_path = os.path.join(TEMP_DIR, f"{uuid.uuid4().hex}.zip")
+    try:
+        with zipfile.ZipFile(output_path, 'w') as zipf:
+            for file_path, arcname in members:
+                zipf.write(file_path, arcname)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        for file_path, _ in members:
+            os.remove(file_path)
+    return output_path, output_filename
+
 @app.route("/api/export-multiple", methods=["POST"])
+@admission.batch
 def export_multiple():
     data = request.get_json()
     file_type = data.get("fileType")
@@ -515,73 +687,19 @@ def export_multiple():
     if not selected or not group:
         return "Missing 'id' parameters", 400
 
-    pdf_files = []
-
     try:
-        for entry in selected:
-            person_id = entry["id"]
-            lastname = entry.get("lastname", "")
-            firstname = entry.get("firstname", "")
-            csv_path = os.path.join(LOG_FILE_DIR, f"{person_id}.csv")
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            export_filename = f"{group}_{lastname}_{firstname}_{timestamp}"
-            
-            pdf_response = generate_report(csv_path, firstname, lastname, full_report=(file_type=="ZIP"))
-            if pdf_response["status"] != "OK":
-                continue  # skip pdf failures
-
-            pdf_path = pdf_response["pdf_path"]
-            target_path = os.path.join(TEMP_DIR, f"{export_filename}.pdf")
-
-            
-            if pdf_path != target_path:
-                # Falls Datei existiert, überschreiben
-                if os.path.exists(target_path):
-                    os.remove(target_path)
-                os.rename(pdf_path, target_path)
-            pdf_files.append(target_path)
-
-        if not pdf_files:
-            return "Keine PDFs zum Verpacken gefunden", 404
-                
-        output_filename = ""
-        output_path = ""
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        if file_type == "PDF":
-            output_filename = f"PDF-Auswertungen_{timestamp}.pdf"
-            output_path = os.path.join(TEMP_DIR, output_filename)
-            # Falls PDF existiert, entfernen
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            
-            # merge pdfs
-            writer = PdfWriter()
-            for file_path in pdf_files:
-                reader = PdfReader(file_path)
-                for page in reader.pages:
-                    writer.add_page(page)
-            with open(output_path, "wb") as f:
-                writer.write(f)
-                 
-        else:
-            output_filename = f"PDF-Auswertungen_{timestamp}.zip"
-            output_path = os.path.join(TEMP_DIR, output_filename)
-            # Falls ZIP existiert, entfernen
-            if os.path.exists(output_path):
-                os.remove(output_path)
-
-            with zipfile.ZipFile(output_path, 'w') as zipf:
-                for file_path in pdf_files:
-                    zipf.write(file_path, os.path.basename(file_path))
+        output_path, output_filename = build_report_export(group, selected, file_type)
 
         @after_this_request
         def cleanup(response):
-            delayed_cleanup(TEMP_DIR)
+            # only this request's file, other exports may still be running
+            delayed_cleanup(output_path)
             return response
 
         return send_file(output_path, as_attachment=True, download_name=output_filename)
 
+    except FileNotFoundError as e:
+        return str(e), 404
     except Exception as e:
         return f"Fehler während der PDF-Erstellung oder Archivierung: {str(e)}", 500
 
@@ -589,12 +707,16 @@ def delayed_cleanup(path, delay=1):
     def remove():
         time.sleep(delay)
         try:
-            shutil.rmtree(path)
+            if os.path.isfile(path):
+                os.remove(path)
+            else:
+                shutil.rmtree(path)
         except Exception as e:
             print(f"[Cleanup Warning] Could not remove temp dir: {e}")
     threading.Thread(target=remove).start()
     
 @app.route("/api/exportCSV-group", methods=["POST"])
+@admission.batch
 def exportCSV_group():
     data = request.get_json()
     file_type = data.get("fileType")
@@ -604,34 +726,119 @@ def exportCSV_group():
     if file_type != "CSV" or not selected:
         return "Ungültige Anfrage", 400
 
-    zip_buffer = BytesIO()
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for entry in selected:
-            file_id = entry.get("id")
-            firstname = entry.get("firstname", "")
-            lastname = entry.get("lastname", "")
-            filename = f"{group}_{lastname}_{firstname}_{timestamp}.csv"
-            filepath = os.path.join(LOG_FILE_DIR, f"{file_id}.csv")
-            if os.path.isfile(filepath):
-                zip_file.write(filepath, arcname=filename)
-            else:
-                # empty file dummy
-                zip_file.writestr(filename, "initials,group,id,lastname,firstname,status,timestamp\n")
+    zip_filename = f"CSV-Logdateien_{timestamp}.zip"
+
+    return zip_response(stream_zip(csv_members(group, selected, timestamp), ZIP_LEVEL, ZIP_WORKERS), zip_filename)
+
+def csv_members(group, selected, timestamp, progress=None):
+    # (arcname, source) of the selected students' logs for stream_zip
+    for done, entry in enumerate(selected, 1):
+        file_id = entry.get("id")
+        firstname = entry.get("firstname", "")
+        lastname = entry.get("lastname", "")
+        filename = f"{group}_{lastname}_{firstname}_{timestamp}.csv"
+        filepath = storage.csv_path(file_id)
+        if os.path.isfile(filepath):
+            yield filename, filepath
+        else:
+            # empty file dummy
+            yield filename, b"initials,group,id,lastname,firstname,status,timestamp\n"
+        if progress:
+            progress(done, len(selected), f"{lastname}, {firstname}")
+
+def counted_members(members, total, progress=None):
+    # passes (arcname, source) through, progress per member
+    for done, (arcname, source) in enumerate(members, 1):
+        yield arcname, source
+        if progress:
+            progress(done, total, arcname)
+
+def build_zip(members, zip_filename):
+    # zip written to a temp file, for export jobs
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    output_path = os.path.join(TEMP_DIR, f"{uuid.uuid4().hex}.zip")
+    try:
+        with open(output_path, "wb") as f:
+            for chunk in stream_zip(members, ZIP_LEVEL, ZIP_WORKERS):
+                f.write(chunk)
+    except BaseException:
+        os.remove(output_path)
+        raise
+    return output_path, zip_filename
+
+def build_csv_export(group, selected, progress=None):
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return build_zip(csv_members(group, selected, timestamp, progress), f"CSV-Logdateien_{timestamp}.zip")
 
-    zip_buffer.seek(0)
+def build_logs_export(progress=None):
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    total = len(storage.person_ids())
+    return build_zip(counted_members(storage.archive_members(), total, progress), f"logs_{timestamp}.zip")
 
-    zip_filename = f"CSV-Logdateien_{timestamp}.zip"
+def build_groups_export(progress=None):
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    total = sum(1 for _ in dir_members(GROUPS_DIR))
+    return build_zip(counted_members(dir_members(GROUPS_DIR), total, progress), f"groups_{timestamp}.zip")
 
-    return send_file(
-        zip_buffer,
-        mimetype='application/zip',
-        as_attachment=True,
-        download_name=zip_filename
-    )
-    
+@app.route("/api/export-jobs", methods=["POST"])
+def submit_export_job():
+    # Start an export in the background, progress via /events, file via /download
+    data = request.get_json()
+    file_type = data.get("fileType")
+    selected = data.get("selected")
+    group = data.get("group")
+    if file_type == "LOGS":
+        build = build_logs_export
+    elif file_type == "GROUPS":
+        build = build_groups_export
+    elif not selected or not group or file_type not in ("PDF", "ZIP", "CSV"):
+        return jsonify({"error": "Ungültige Anfrage"}), 400
+    elif file_type == "CSV":
+        build = partial(build_csv_export, group, selected)
+    else:
+        build = partial(build_report_export, group, selected, file_type)
+    # the job is admitted like any batch request: it takes its slot now (or
+    # gets the 503) and holds it until it has finished
+    try:
+        token = admission.acquire(timeout=admission.queue_timeout)
+    except Overloaded:
+        return admission.overloaded_response()
+    def run(progress):
+        try:
+            return build(progress)
+        finally:
+            admission.release(token)
+
+    try:
+        job_id = export_jobs.submit(file_type, run, total=len(selected or []))
+    except BaseException:
+        admission.release(token)
+        raise
+    return jsonify({"id": job_id}), 202
+
+@app.route("/api/export-jobs/<job_id>", methods=["GET"])
+def export_job_status(job_id):
+    status = export_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unbekannter Export"}), 404
+    return jsonify(status)
+
+@app.route("/api/export-jobs/<job_id>/events", methods=["GET"])
+def export_job_events(job_id):
+    return Response(export_jobs.events(job_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/export-jobs/<job_id>/download", methods=["GET"])
+def export_job_download(job_id):
+    artifact = export_jobs.artifact(job_id)
+    if artifact is None:
+        return "Export nicht (mehr) verfügbar", 404
+    path, download_name = artifact
+    return send_file(path, as_attachment=True, download_name=download_name)
 
 @app.route("/api/exportCSV-person", methods=["GET"])
+@admission.batch
 def exportCSV_person():
     person_id = request.args.get('id')
     firstname = request.args.get('firstname')
@@ -639,15 +846,35 @@ def exportCSV_person():
     if not person_id:
         return "Missing 'id' parameter", 400
 
-    csv_path = os.path.join(LOG_FILE_DIR, person_id + ".csv")
-    
-    if not os.path.exists(csv_path):
+    if not storage.exists(person_id):
         return f"CSV file for id {person_id} not found", 404
+    csv_path = storage.csv_path(person_id)
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"{lastname}_{firstname}_{timestamp}.csv"
     return send_file(csv_path, as_attachment=True, download_name=filename)
 
+def warm_up_reports():
+    # Load the report workers (pandas, reportlab) in the background once the
+    # server is up, so the first export doesn't pay for the imports
+    def warm_up():
+        time.sleep(REPORT_WARMUP_DELAY)
+        try:
+            report_pool.warm_up()
+        except Exception as e:
+            print(f"[Warmup Warning] {e}")
+    threading.Thread(target=warm_up, daemon=True).start()
+
+def warm_up_presence():
+    # build the presence map from the log tails right after the start instead
+    # of on the first request
+    def warm_up():
+        try:
+            presence.sync()
+        except Exception as e:
+            print(f"[Warmup Warning] {e}")
+    threading.Thread(target=warm_up, daemon=True).start()
+
 def read_port(config_path: str, default_port: int = 4000) -> int:
     # Read port from file, fallback to default
     try:
@@ -657,7 +884,29 @@ def read_port(config_path: str, default_port: int = 4000) -> int:
         return default_port
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PresenceLogger")
+    parser.add_argument("--production", action="store_true",
+                        help="mehrere Worker-Prozesse statt des Flask-Entwicklungsservers starten")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Anzahl der Worker-Prozesse im Produktionsmodus")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Berichtsmodule nach dem Start im Hintergrund laden (schnellerer erster Export)")
+    args = parser.parse_args()
+
     port_config_path = os.path.join(os.path.dirname(__file__), "port.conf")
     port = read_port(port_config_path)
-    
-    app.run(host="0.0.0.0", port=port, debug=False)
\ No newline at end of file
+
+    def on_start(worker=0):
+        warm_up_presence()
+        # the report pool is only warmed up once, in the first server process
+        if args.warmup and worker == 0:
+            warm_up_reports()
+
+    if args.production:
+        workers = max(1, args.workers)
+        # every server process has its own report pool, together REPORT_WORKERS
+        report_pool.workers = max(1, REPORT_WORKERS // workers)
+        serve_production(app, "0.0.0.0", port, workers, on_worker_start=on_start)
+    else:
+        on_start()
+        app.run(host="0.0.0.0", port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,174 @@
+from io import BytesIO
+import numpy as np
+from reportlab.graphics.shapes import Drawing, Rect, String, Line, Group
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib import colors
+from reportlab.platypus import Image
+
+# matplotlib's "Blues" colormap (ColorBrewer anchors)
+BLUES = ["#f7fbff", "#deebf7", "#c6dbef", "#9ecae1", "#6baed6", "#4292c6", "#2171b5", "#08519c", "#08306b"]
+SKYBLUE = colors.HexColor("#87ceeb")
+GRID_COLOR = colors.Color(0.69, 0.69, 0.69, alpha=0.7)
+FONT = "Helvetica"
+
+
+def _blues(t):
+    # t in [0, 1] -> interpolated color
+    anchors = [colors.HexColor(c) for c in BLUES]
+    pos = min(max(t, 0.0), 1.0) * (len(anchors) - 1)
+    i = min(int(pos), len(anchors) - 2)
+    f = pos - i
+    a, b = anchors[i], anchors[i + 1]
+    return colors.Color(a.red + (b.red - a.red) * f, a.green + (b.green - a.green) * f, a.blue + (b.blue - a.blue) * f)
+
+
+def _text_color(color):
+    # same rule as seaborn's annotations: dark text on light cells
+    def linear(c):
+        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+    luminance = 0.2126 * linear(color.red) + 0.7152 * linear(color.green) + 0.0722 * linear(color.blue)
+    return colors.Color(0.15, 0.15, 0.15) if luminance > 0.408 else colors.white
+
+
+def _nice_step(max_value, max_ticks=8):
+    for step in (1, 2, 5, 10, 20, 25, 50, 100, 200, 250, 500, 1000):
+        if max_value / step <= max_ticks:
+            return step
+    return int(np.ceil(max_value / max_ticks))
+
+
+# ---------- reportlab (vector) ----------
+def _heatmap_drawing(values, xlabels, ylabels, width, height):
+    values = np.asarray(values)
+    n_rows, n_cols = values.shape
+    tick_size, label_size, annot_size = 8, 10, 9
+
+    left = max([stringWidth(label, FONT, tick_size) for label in ylabels] + [0]) + 6 + label_size + 6
+    bottom, top, right = tick_size + label_size + 14, 6, 6
+    cell_w = (width - left - right) / n_cols
+    cell_h = (height - bottom - top) / max(n_rows, 1)
+
+    vmin, vmax = (values.min(), values.max()) if values.size else (0, 0)
+    span = vmax - vmin
+
+    d = Drawing(width, height)
+    for r in range(n_rows):
+        y = height - top - (r + 1) * cell_h  # first slot at the top
+        for c in range(n_cols):
+            x = left + c * cell_w
+            color = _blues((values[r, c] - vmin) / span if span else 0)
+            d.add(Rect(x, y, cell_w, cell_h, fillColor=color, strokeColor=None))
+            d.add(String(x + cell_w / 2, y + cell_h / 2 - annot_size / 3, str(int(values[r, c])),
+                         fontName=FONT, fontSize=annot_size, fillColor=_text_color(color), textAnchor="middle"))
+        d.add(String(left - 4, y + cell_h / 2 - tick_size / 3, ylabels[r],
+                     fontName=FONT, fontSize=tick_size, textAnchor="end"))
+    for c, label in enumerate(xlabels):
+        d.add(String(left + (c + 0.5) * cell_w, bottom - tick_size - 4, label,
+                     fontName=FONT, fontSize=tick_size, textAnchor="middle"))
+
+    d.add(String(left + (width - left - right) / 2, 2, "Wochentag",
+                 fontName=FONT, fontSize=label_size, textAnchor="middle"))
+    ylabel = Group(String(0, 0, "Schulstunde", fontName=FONT, fontSize=label_size, textAnchor="middle"))
+    ylabel.rotate(90)
+    ylabel.translate((bottom + height - top) / 2, -label_size)
+    d.add(ylabel)
+    return d
+
+
+def _histogram_drawing(histogram, bins, width, height):
+    counts = np.asarray(histogram)
+    tick_size, label_size, title_size = 8, 10, 11
+    left, bottom, top, right = 36, tick_size + label_size + 16, title_size + 10, 10
+    plot_w, plot_h = width - left - right, height - bottom - top
+
+    x_min, x_max = bins[0], bins[-1]
+    x_pad = (x_max - x_min) * 0.05
+    y_max = max(int(counts.max()) if counts.size else 0, 1)
+    step = _nice_step(y_max)
+    y_top = y_max * 1.05
+
+    def sx(v):
+        return left + (v - x_min + x_pad) / (x_max - x_min + 2 * x_pad) * plot_w
+
+    def sy(v):
+        return bottom + v / y_top * plot_h
+
+    d = Drawing(width, height)
+    # dashed grid on the y axis, behind the bars
+    for tick in range(0, int(y_top) + 1, step):
+        d.add(Line(left, sy(tick), left + plot_w, sy(tick), strokeColor=GRID_COLOR,
+                   strokeWidth=0.6, strokeDashArray=[3, 2]))
+        d.add(String(left - 4, sy(tick) - tick_size / 3, str(tick), fontName=FONT, fontSize=tick_size, textAnchor="end"))
+    for count, lo, hi in zip(counts, bins[:-1], bins[1:]):
+        if count:
+            d.add(Rect(sx(lo), sy(0), sx(hi) - sx(lo), sy(count) - sy(0),
+                       fillColor=SKYBLUE, strokeColor=colors.black, strokeWidth=0.6))
+    for tick in bins:
+        d.add(Line(sx(tick), bottom, sx(tick), bottom - 3, strokeColor=colors.black, strokeWidth=0.6))
+        d.add(String(sx(tick), bottom - tick_size - 4, str(tick), fontName=FONT, fontSize=tick_size, textAnchor="middle"))
+    d.add(Rect(left, bottom, plot_w, plot_h, fillColor=None, strokeColor=colors.black, strokeWidth=0.6))
+
+    d.add(String(left + plot_w / 2, height - title_size, "Verteilung der Austrittsdauer",
+                 fontName=FONT, fontSize=title_size, textAnchor="middle"))
+    d.add(String(left + plot_w / 2, 2, "Dauer (Minuten)", fontName=FONT, fontSize=label_size, textAnchor="middle"))
+    ylabel = Group(String(0, 0, "Anzahl", fontName=FONT, fontSize=label_size, textAnchor="middle"))
+    ylabel.rotate(90)
+    ylabel.translate(bottom + plot_h / 2, -label_size)
+    d.add(ylabel)
+    return d
+
+
+# ---------- matplotlib/seaborn (legacy, raster) ----------
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _heatmap_image(values, xlabels, ylabels, width, height):
+    import seaborn as sns
+    plt = _pyplot()
+    image = BytesIO()
+    plt.figure(figsize=(8, 5))
+    sns.heatmap(values, annot=True, fmt='d', cmap='Blues', cbar=False,
+                xticklabels=xlabels,
+                yticklabels=ylabels)
+    plt.xlabel('Wochentag')
+    plt.ylabel('Schulstunde')
+    plt.tight_layout()
+    plt.savefig(image, format='png')
+    plt.close()
+    image.seek(0)
+    return Image(image, width=width, height=height)
+
+
+def _histogram_image(durations_min, bins, width, height):
+    plt = _pyplot()
+    image = BytesIO()
+    plt.figure(figsize=(6, 4))
+    plt.hist(durations_min, bins=bins, edgecolor='black', color='skyblue')
+    plt.title('Verteilung der Austrittsdauer')
+    plt.xlabel('Dauer (Minuten)')
+    plt.ylabel('Anzahl')
+    plt.xticks(bins)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(image, format='png')
+    plt.close()
+    image.seek(0)
+    return Image(image, width=width, height=height)
+
+
+def heatmap(pivot, xlabels, ylabels, width, height, backend="reportlab"):
+    # Flowable with the weekday x timeslot heatmap of `pivot` (slots as rows)
+    if backend == "matplotlib":
+        return _heatmap_image(pivot, xlabels, ylabels, width, height)
+    return _heatmap_drawing(pivot.to_numpy(), xlabels, ylabels, width, height)
+
+
+def histogram(stats, width, height, backend="reportlab"):
+    # Flowable with the histogram of the durations from pairing.pair_statistics
+    if backend == "matplotlib":
+        return _histogram_image(stats["durations_min"], stats["bins"], width, height)
+    return _histogram_drawing(stats["histogram"], stats["bins"], width, height)
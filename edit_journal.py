@@ -0,0 +1,244 @@
+import os
+import csv
+import heapq
+import threading
+import time
+from log_reader import DateIndex, read_lines_backwards, read_log, parse_rows
+
+MATCH_FIELDS = ["initials", "group", "lastname", "firstname", "status", "timestamp"]
+# offset: size of the log when the record was written
+JOURNAL_HEADER = ["op"] + MATCH_FIELDS + ["new_status", "new_timestamp", "offset"]
+
+
+def _matches(row, target):
+    return all(row[field] == target[field] for field in MATCH_FIELDS)
+
+
+def _op_end(op):
+    # records without offset (older journals) apply to the whole log
+    return int(op["offset"]) if op.get("offset") else float("inf")
+
+
+def apply_journal(rows, ops):
+    # Replay delete/update records on top of the (offset, row) pairs of a log
+    # file. A record only applies to rows that were in the log when it was
+    # written, not to equal rows appended later. The result is in
+    # chronological order (stable, so equal timestamps keep the file order),
+    # whatever order the file is in ("sort" records only mark where it
+    # stopped being chronological).
+    for op in ops:
+        end = _op_end(op)
+        if op["op"] == "delete":
+            # remove every row that matches *totally*
+            rows = [(offset, row) for offset, row in rows if not (offset < end and _matches(row, op))]
+        elif op["op"] == "update":
+            for offset, row in rows:
+                if offset < end and _matches(row, op):
+                    row["status"] = op["new_status"]
+                    row["timestamp"] = op["new_timestamp"]
+                    break
+    rows.sort(key=lambda pair: (pair[1]["timestamp"], pair[0]))
+    return rows
+
+
+class EditJournal:
+    # Log-structured edits for the per-person log files.
+    #
+    # Deletions and corrections are appended as tombstone/correction records to
+    # `journal_dir/<id>.csv` instead of rewriting the whole log, and readers
+    # replay them on the fly. A background compactor periodically folds the
+    # journal into the log file (temp file + atomic rename).
+
+    def __init__(self, log_dir, journal_dir, locks, event_writer, compact_interval=60, index=None):
+        self.log_dir = log_dir
+        self.journal_dir = journal_dir
+        self.locks = locks
+        self.event_writer = event_writer
+        self.index = index or DateIndex()
+        self.compact_interval = compact_interval
+        self._compactor_pid = None
+        self._compactor_lock = threading.Lock()
+
+    def log_path(self, person_id):
+        return os.path.join(self.log_dir, f"{person_id}.csv")
+
+    def journal_path(self, person_id):
+        return os.path.join(self.journal_dir, f"{person_id}.csv")
+
+    # ---------- reading ----------
+    def read_entries(self, person_id):
+        with self.locks.read(person_id):
+            return self._read_entries(person_id)
+
+    def _read_entries(self, person_id):
+        _, rows = read_log(self.log_path(person_id))
+        return [row for _, row in apply_journal(rows, self._read_ops(person_id))]
+
+    def read_days(self, person_id, days):
+        # Only the rows of the given dates ("YYYY-MM-DD"), found via the date index
+        with self.locks.read(person_id):
+            return self._read_days(person_id, days)
+
+    def _read_days(self, person_id, days):
+        days = set(days)
+        ops = self._read_ops(person_id)
+        # journal records may move rows between days, so include their dates too
+        needed = days | {op[field][:10] for op in ops for field in ("timestamp", "new_timestamp") if op[field]}
+        rows = self.index.read_days(self.log_path(person_id), needed)
+        return [row for _, row in apply_journal(rows, ops) if row["timestamp"][:10] in days]
+
+    def read_page(self, person_id, limit, before=None, skip=0):
+        # Newest-first page of entries, read backwards from the end of the file.
+        # Only the rows the journal can have changed are read as a whole: the
+        # days its records touch and everything after the first "sort" record
+        # (the file is chronological before it); they are merged into the
+        # backwards read with the journal applied.
+        # The cursor (before, skip) is the timestamp of the oldest row already
+        # delivered and the number of delivered rows with exactly that timestamp.
+        # Returns (rows, next_cursor); next_cursor is None on the last page.
+        path = self.log_path(person_id)
+        with self.locks.read(person_id):
+            ops = self._read_ops(person_id)
+            days = {op[field][:10] for op in ops for field in ("timestamp", "new_timestamp") if op[field]}
+            unsorted_from = min((int(op["offset"]) for op in ops if op["op"] == "sort"), default=None)
+            tail = self.index.tail(path, before[:10] if before else None, until=unsorted_from)
+            if tail is None:
+                return [], None
+            header, data_start, end = tail
+
+            edited = dict(self.index.read_days(path, days)) if days else {}
+            if unsorted_from is not None:
+                unsorted_from = max(unsorted_from, data_start)
+                with open(path, "rb") as f:
+                    f.seek(unsorted_from)
+                    edited.update(parse_rows(f.read(), unsorted_from, header))
+                end = min(end, unsorted_from)
+            edited = [(row["timestamp"], offset, row) for offset, row in reversed(apply_journal(list(edited.items()), ops))]
+
+            def backwards():
+                for offset, line in read_lines_backwards(path, data_start, end):
+                    row = next(csv.DictReader([line], fieldnames=header))
+                    if row["timestamp"][:10] not in days:
+                        yield row["timestamp"], offset, row
+
+            rows = []
+            seen_at_cursor = 0
+            exhausted = True
+            for timestamp, _, row in heapq.merge(edited, backwards(), key=lambda item: item[:2], reverse=True):
+                if before is not None:
+                    if timestamp > before:
+                        continue  # already delivered
+                    if timestamp == before and seen_at_cursor < skip:
+                        seen_at_cursor += 1
+                        continue
+                if len(rows) == limit:
+                    exhausted = False
+                    break
+                rows.append(row)
+
+        if exhausted:
+            return rows, None
+        last = rows[-1]["timestamp"]
+        at_last = sum(1 for row in rows if row["timestamp"] == last)
+        return rows, {"before": last, "skip": at_last + (skip if last == before else 0)}
+
+    def _read_ops(self, person_id):
+        try:
+            with open(self.journal_path(person_id), newline="", encoding="utf-8") as f:
+                ops = list(csv.DictReader(f))
+        except FileNotFoundError:
+            return []
+        for op in ops:
+            if None in op:
+                # appended to a journal with the old header (without offset)
+                op["offset"] = op.pop(None)[0]
+        return ops
+
+    # ---------- editing ----------
+    def delete(self, person_id, target):
+        with self.locks.write(person_id):
+            rows = self._read_days(person_id, {target["timestamp"][:10]})
+            if not any(_matches(row, target) for row in rows):
+                return False
+            self._append_op(person_id, ["delete"] + [target[field] for field in MATCH_FIELDS] + ["", ""])
+        return True
+
+    def update(self, person_id, orig, new):
+        with self.locks.write(person_id):
+            rows = self._read_days(person_id, {orig["timestamp"][:10]})
+            if not any(_matches(row, orig) for row in rows):
+                return False
+            self._append_op(person_id, ["update"] + [orig[field] for field in MATCH_FIELDS]
+                            + [new["status"], new["timestamp"]])
+        return True
+
+    def mark_unsorted(self, person_id):
+        # called by the EventWriter (write lock held) before it appends a row
+        # older than the last one; the compactor sorts the log again
+        self._append_op(person_id, ["sort"] + [""] * (len(MATCH_FIELDS) + 2))
+
+    def _append_op(self, person_id, op_row):
+        # call with the write lock held: all appended rows are in the file
+        try:
+            offset = os.path.getsize(self.log_path(person_id))
+        except FileNotFoundError:
+            offset = 0
+        os.makedirs(self.journal_dir, exist_ok=True)
+        with open(self.journal_path(person_id), "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(JOURNAL_HEADER)
+            writer.writerow(op_row + [offset])
+            f.flush()
+            os.fsync(f.fileno())
+        self._ensure_compactor()
+
+    # ---------- compaction ----------
+    def compact(self, person_id):
+        # Fold the journal into the log file and restore the chronological
+        # order (an update or a late append can move an entry ahead of later
+        # ones); cheap no-op without journal
+        log_file = self.log_path(person_id)
+        if not os.path.exists(self.journal_path(person_id)):
+            return
+        with self.locks.write(person_id):
+            ops = self._read_ops(person_id)
+            if not ops:
+                return
+            fld, rows = read_log(log_file)
+            if fld is not None:
+                rows = [row for _, row in apply_journal(rows, ops)]
+
+                temp_file = log_file + ".tmp"
+                with open(temp_file, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=fld)
+                    writer.writeheader()
+                    writer.writerows(rows)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.event_writer.invalidate(person_id)
+                os.replace(temp_file, log_file)
+            os.remove(self.journal_path(person_id))
+
+    def compact_all(self):
+        if not os.path.isdir(self.journal_dir):
+            return
+        for filename in os.listdir(self.journal_dir):
+            if filename.endswith(".csv"):
+                try:
+                    self.compact(filename[:-4])
+                except Exception as e:
+                    print(f"[Compaction Warning] Could not compact {filename}: {e}")
+
+    def _ensure_compactor(self):
+        # Started lazily, so every (forked) worker process gets its own thread
+        with self._compactor_lock:
+            if self._compactor_pid == os.getpid():
+                return
+            self._compactor_pid = os.getpid()
+        threading.Thread(target=self._compactor_loop, daemon=True).start()
+
+    def _compactor_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            self.compact_all()
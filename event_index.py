@@ -0,0 +1,136 @@
+import os
+import re
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from urllib.parse import quote, unquote
+
+DAY_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+COMPLETE_MARKER = ".complete"
+
+
+def days_between(start, end):
+    # "YYYY-MM-DD" of every day from start to end (inclusive)
+    day, last = date.fromisoformat(start[:10]), date.fromisoformat(end[:10])
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+class EventIndex:
+    # Secondary index for queries across students: for every day and group the
+    # ids of the persons with entries, one per line in
+    # `index_dir/<YYYY-MM-DD>/<group>.txt`. A query only opens the logs listed
+    # for its days instead of every file in data/log.
+    #
+    # Postings are only ever added (new entries, updates moving an entry to
+    # another day). Appends are single small O_APPEND writes, so worker
+    # processes don't need a lock; duplicates are dropped when reading and a
+    # stale id after a deletion only costs a lookup in that log, whose rows
+    # stay the source of truth.
+    #
+    # Each process remembers the postings it wrote, for the generation of the
+    # index given by the `.complete` marker: clear() and rebuild() in any
+    # process write a new marker, and the others start over on their next add.
+
+    def __init__(self, index_dir, cached_days=8):
+        self.index_dir = index_dir
+        self.cached_days = cached_days
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._known = OrderedDict()  # day -> {(group, person_id)} written by this process
+        self._generation = None  # (inode, mtime) of the marker _known belongs to
+
+    def _path(self, day, group):
+        return os.path.join(self.index_dir, day, f"{quote(group, safe='')}.txt")
+
+    def add(self, postings):
+        # postings: (timestamp or day, group, person_id)
+        new = {}
+        generation = self._marker_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._known.clear()
+                self._generation = generation
+            for timestamp, group, person_id in postings:
+                day = timestamp[:10]
+                if not DAY_PATTERN.match(day):
+                    continue  # invalid timestamp, can't be queried by date anyway
+                known = self._known.pop(day, None) or set()
+                self._known[day] = known
+                if (group, person_id) not in known:
+                    known.add((group, person_id))
+                    new.setdefault((day, group), []).append(person_id)
+            while len(self._known) > self.cached_days:
+                self._known.popitem(last=False)
+        for (day, group), person_ids in new.items():
+            path = self._path(day, group)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, "".join(f"{person_id}\n" for person_id in person_ids).encode("utf-8"))
+            finally:
+                os.close(fd)
+
+    def persons(self, day, group=None):
+        # {person_id: {groups}} listed for a day, optionally only one group
+        day_dir = os.path.join(self.index_dir, day)
+        if group is not None:
+            filenames = [f"{quote(group, safe='')}.txt"]
+        elif os.path.isdir(day_dir):
+            filenames = [filename for filename in os.listdir(day_dir) if filename.endswith(".txt")]
+        else:
+            return {}
+        result = {}
+        for filename in filenames:
+            try:
+                with open(os.path.join(day_dir, filename), encoding="utf-8") as f:
+                    person_ids = set(filter(None, f.read().splitlines()))
+            except FileNotFoundError:
+                continue
+            for person_id in person_ids:
+                result.setdefault(person_id, set()).add(unquote(filename[:-4]))
+        return result
+
+    def is_complete(self):
+        return os.path.exists(os.path.join(self.index_dir, COMPLETE_MARKER))
+
+    def _marker_generation(self):
+        try:
+            st = os.stat(os.path.join(self.index_dir, COMPLETE_MARKER))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def rebuild(self, entries_by_person):
+        # One full scan for logs written before the index existed;
+        # entries_by_person yields (person_id, rows)
+        with self._rebuild_lock:
+            if self.is_complete():
+                return
+            for person_id, rows in entries_by_person:
+                self.add((row["timestamp"], row["group"], person_id) for row in rows)
+            self._mark_complete()
+
+    def clear(self):
+        with self._lock:
+            self._known.clear()
+            if os.path.isdir(self.index_dir):
+                for name in os.listdir(self.index_dir):
+                    path = os.path.join(self.index_dir, name)
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+        self._mark_complete()  # nothing left to index
+
+    def _mark_complete(self):
+        # always a new file (new inode): starts a new generation
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = os.path.join(self.index_dir, COMPLETE_MARKER)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            f.write("")
+        os.replace(tmp, path)
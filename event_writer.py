@@ -0,0 +1,167 @@
+import os
+import csv
+import threading
+from collections import OrderedDict
+from lock_manager import LockManager
+from log_reader import read_lines_backwards
+
+LOG_HEADER = ["initials", "group", "id", "lastname", "firstname", "status", "timestamp"]
+
+
+def _last_timestamp(path, size):
+    # timestamp (last column) of the last row, "" if there is none
+    for offset, line in read_lines_backwards(path, 0, size):
+        return line.rsplit(",", 1)[-1] if offset else ""  # offset 0: header
+    return ""
+
+
+def _is_stale(f, path):
+    try:
+        return os.stat(path).st_ino != os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return True
+
+
+class _Batch:
+    # Rows of all requests that arrived while the previous batch was being written
+    def __init__(self):
+        self.rows = []
+        self.done = False
+        self.error = None
+
+
+class EventWriter:
+    # Appends log rows to the per-person CSV files in `log_dir`.
+    #
+    # Concurrent callers are group-committed: the first caller that finds the
+    # writer idle becomes the leader and writes the rows of every request queued
+    # behind it, with a single flush/fsync per touched file. The other callers
+    # just wait until their batch is durable. Hot file handles stay open in an
+    # LRU so repeated check-ins of the same people don't reopen their files.
+    #
+    # Logs are kept in chronological order so readers can start at the end.
+    # Before a row older than the last one in the file is appended,
+    # on_unsorted(person_id) is called (with the write lock held), which
+    # records that the log needs sorting from there on.
+
+    def __init__(self, log_dir, max_open_files=64, fsync=True, locks=None, on_unsorted=None):
+        self.log_dir = log_dir
+        self.max_open_files = max_open_files
+        self.fsync = fsync
+        self.locks = locks or LockManager()
+        self.on_unsorted = on_unsorted
+        self._io_lock = threading.Lock()  # guards the handle cache
+        self._cond = threading.Condition()
+        self._open_batch = _Batch()
+        self._flushing = False
+        self._handles = OrderedDict()  # person_id -> file object, oldest first
+        self._tails = {}  # person_id -> (inode, size, last timestamp) after our last write
+
+    def append(self, rows):
+        # rows: iterable of (person_id, row) - returns once the rows are on disk
+        with self._cond:
+            batch = self._open_batch
+            batch.rows.extend(rows)
+            while not batch.done:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # become the leader for the current batch
+                self._flushing = True
+                self._open_batch = _Batch()
+                self._cond.release()
+                try:
+                    self._commit(batch.rows)
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    self._cond.acquire()
+                    batch.done = True
+                    self._flushing = False
+                    self._cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
+
+    def _commit(self, rows):
+        # group rows per person, keeping the arrival order within each file
+        per_person = OrderedDict()
+        for person_id, row in rows:
+            per_person.setdefault(person_id, []).append(row)
+
+        with self.locks.write_many(per_person), self._io_lock:
+            touched = []
+            try:
+                for person_id, person_rows in per_person.items():
+                    f = self._handle(person_id)
+                    last = self._last_timestamp(person_id, f)
+                    for row in person_rows:
+                        if row[6] < last and self.on_unsorted:
+                            self.on_unsorted(person_id)
+                            break
+                        last = row[6]
+                    csv.writer(f).writerows(person_rows)
+                    touched.append((person_id, f, person_rows[-1][6]))
+                for person_id, f, last in touched:
+                    if f.closed:
+                        continue  # evicted (and synced) by a later _handle() of this batch
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                    st = os.fstat(f.fileno())
+                    self._tails[person_id] = (st.st_ino, st.st_size, last)
+            except Exception:
+                # don't keep handles in an unknown state around
+                self._close_all()
+                raise
+
+    def _last_timestamp(self, person_id, f):
+        # from our last write unless another process has appended since
+        st = os.fstat(f.fileno())
+        tail = self._tails.get(person_id)
+        if tail is not None and tail[:2] == (st.st_ino, st.st_size):
+            return tail[2]
+        return _last_timestamp(f.name, st.st_size)
+
+    def _handle(self, person_id):
+        path = os.path.join(self.log_dir, f"{person_id}.csv")
+        f = self._handles.pop(person_id, None)
+        if f is not None and _is_stale(f, path):
+            # removed or replaced by another worker process
+            f.close()
+            f = None
+        if f is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            f = open(path, "a", newline="", encoding="utf-8")
+            # Create header if the file is new
+            if f.tell() == 0:
+                csv.writer(f).writerow(LOG_HEADER)
+            while len(self._handles) >= self.max_open_files:
+                _, oldest = self._handles.popitem(last=False)
+                # may hold rows of the running batch
+                oldest.flush()
+                if self.fsync:
+                    os.fsync(oldest.fileno())
+                oldest.close()
+        self._handles[person_id] = f
+        return f
+
+    def invalidate(self, person_id):
+        # Close the cached handle, e.g. before a log file is replaced or removed
+        with self._io_lock:
+            self._tails.pop(person_id, None)
+            f = self._handles.pop(person_id, None)
+            if f is not None:
+                f.close()
+
+    def close_all(self):
+        with self._io_lock:
+            self._close_all()
+
+    def _close_all(self):
+        self._tails.clear()
+        while self._handles:
+            _, f = self._handles.popitem()
+            try:
+                f.close()
+            except OSError:
+                pass
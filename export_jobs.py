@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+STATUS_FILE = "status.json"
+ARTIFACT_FILE = "artifact"
+
+
+class ExportJobs:
+    # Background export jobs.
+    #
+    # A job runs `build(progress)` in a thread pool; build reports progress via
+    # progress(done, total, message) and returns (path, download_name) of the
+    # finished file. State and artifact live in `jobs_dir/<id>/`, so every
+    # worker process can report progress and serve the download, not only the
+    # one that runs the job. Finished jobs are removed after `retention` seconds;
+    # every process that has run jobs checks for them each `cleanup_interval`
+    # seconds. A failed job keeps only its status, no partial artifact.
+
+    def __init__(self, jobs_dir, workers=2, retention=30 * 60, poll_interval=0.5, heartbeat=15, cleanup_interval=60):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.cleanup_interval = cleanup_interval
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # one pool per (forked) worker process
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="export")
+                self._executor_pid = os.getpid()
+                threading.Thread(target=self._clean_periodically, name="export-cleanup", daemon=True).start()
+            return self._executor
+
+    def _clean_periodically(self):
+        while True:
+            time.sleep(self.cleanup_interval)
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"[Cleanup Warning] {e}")
+
+    def _job_dir(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ""):
+            raise KeyError(job_id)
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _write_status(self, job_id, **fields):
+        path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+        status = self.status(job_id) or {"id": job_id}
+        status.update(fields, updated=time.time(), seq=status.get("seq", 0) + 1)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp, path)
+
+    def status(self, job_id):
+        try:
+            with open(os.path.join(self._job_dir(job_id), STATUS_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+
+    def submit(self, kind, build, total=0):
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        self._write_status(job_id, kind=kind, state="queued", done=0, total=total, message="")
+        self._get_executor().submit(self._run, job_id, build)
+        return job_id
+
+    def _run(self, job_id, build):
+        def progress(done, total, message=""):
+            self._write_status(job_id, state="running", done=done, total=total, message=message)
+
+        artifact = os.path.join(self._job_dir(job_id), ARTIFACT_FILE)
+        path = None
+        try:
+            self._write_status(job_id, state="running")
+            path, download_name = build(progress)
+            os.replace(path, artifact)
+            self._write_status(job_id, state="done", filename=download_name, finished=time.time())
+        except Exception as e:
+            # no partial output is left behind (build removes its own on errors)
+            for leftover in (path, artifact):
+                if leftover:
+                    try:
+                        os.remove(leftover)
+                    except OSError:
+                        pass
+            self._write_status(job_id, state="error", error=str(e), finished=time.time())
+
+    def artifact(self, job_id):
+        # (path, download_name) of a finished job, None otherwise
+        status = self.status(job_id)
+        if not status or status["state"] != "done":
+            return None
+        return os.path.join(self._job_dir(job_id), ARTIFACT_FILE), status["filename"]
+
+    def events(self, job_id):
+        # Server-sent events: "progress" on every change, then "done" or
+        # "error". Comments as heartbeat keep proxies from closing the stream.
+        last_seq = None
+        last_sent = time.monotonic()
+        while True:
+            status = self.status(job_id)
+            if status is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Unbekannter Export'})}\n\n"
+                return
+            if status["seq"] != last_seq:
+                last_seq = status["seq"]
+                last_sent = time.monotonic()
+                event = status["state"] if status["state"] in ("done", "error") else "progress"
+                yield f"event: {event}\ndata: {json.dumps(status)}\n\n"
+                if event != "progress":
+                    return
+            elif time.monotonic() - last_sent >= self.heartbeat:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+            time.sleep(self.poll_interval)
+
+    def cleanup(self):
+        # remove jobs finished more than `retention` seconds ago; queued and
+        # running jobs are kept however long they take
+        if not os.path.isdir(self.jobs_dir):
+            return
+        now = time.time()
+        for job_id in os.listdir(self.jobs_dir):
+            status = self.status(job_id)
+            if status is None or status["state"] not in ("done", "error"):
+                continue
+            if now - status["finished"] > self.retention:
+                shutil.rmtree(os.path.join(self.jobs_dir, job_id), ignore_errors=True)
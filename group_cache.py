@@ -0,0 +1,121 @@
+import os
+import csv
+import json
+import hashlib
+import shutil
+import tempfile
+import threading
+import uuid
+
+
+class GroupCache:
+    # In-process cache of the sorted group list and the parsed group rosters.
+    #
+    # Entries are validated with a single stat() per access: the group list
+    # against inode and mtime of the groups directory, a roster against mtime, size
+    # and inode of its file. That also picks up changes made by other worker
+    # processes; changes made in this process call invalidate() explicitly.
+    #
+    # Importers build a complete new group set in a staging directory and
+    # swap() it in under the write lock; readers that hit the moment between
+    # the two renames wait for the lock and see the new set.
+
+    def __init__(self, groups_dir, locks):
+        self.groups_dir = groups_dir
+        self.locks = locks
+        self._lock = threading.Lock()
+        self._group_list = None  # (dir signature, sorted names)
+        self._members = {}       # name -> (file signature, members, etag)
+
+    def _stat(self, path):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            with self.locks.read("groups"):  # a swap may be in progress
+                return os.stat(path)
+
+    def group_list(self):
+        st = self._stat(self.groups_dir)
+        # the inode too: a swapped-in directory can carry the same mtime
+        signature = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            if self._group_list is not None and self._group_list[0] == signature:
+                return list(self._group_list[1])
+        with self.locks.read("groups"):
+            groups = [file[:-4] for file in os.listdir(self.groups_dir) if file.endswith(".csv")]
+        groups.sort(key=str.lower)
+        with self._lock:
+            self._group_list = (signature, groups)
+        return list(groups)
+
+    def members(self, name):
+        # Returns (members, etag)
+        path = os.path.join(self.groups_dir, name + ".csv")
+        st = self._stat(path)
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            cached = self._members.get(name)
+            if cached is not None and cached[0] == signature:
+                return cached[1], cached[2]
+
+        with self.locks.read("groups"), open(path, newline="", encoding="utf-8") as csvfile:
+            members = roster_members(csv.DictReader(csvfile))
+        etag = _etag(members)
+        with self._lock:
+            self._members[name] = (signature, members, etag)
+        return members, etag
+
+    def put(self, name, members):
+        # Warm the cache with a roster that was just written (and parsed);
+        # call with the groups write lock held
+        st = os.stat(os.path.join(self.groups_dir, name + ".csv"))
+        with self._lock:
+            self._members[name] = ((st.st_mtime_ns, st.st_size, st.st_ino), members, _etag(members))
+
+    def staging_dir(self):
+        # empty directory on the same filesystem for building a new group set
+        parent = os.path.dirname(self.groups_dir)
+        os.makedirs(parent, exist_ok=True)
+        path = tempfile.mkdtemp(prefix=".groups-staging-", dir=parent)
+        os.chmod(path, 0o755)
+        return path
+
+    def swap(self, staging, rosters=None):
+        # Replace the whole group set by the (complete) staging directory.
+        # rosters: {name: members} already parsed while staging, cached before
+        # the lock is released so no other import can replace the files first
+        old = f"{self.groups_dir}.old-{uuid.uuid4().hex}"
+        with self.locks.write("groups"):
+            if os.path.isdir(self.groups_dir):
+                os.rename(self.groups_dir, old)
+            os.rename(staging, self.groups_dir)
+            self.invalidate()
+            for name, members in (rosters or {}).items():
+                self.put(name, members)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def discard(self, staging):
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def invalidate(self):
+        with self._lock:
+            self._group_list = None
+            self._members.clear()
+
+
+def roster_members(rows):
+    # members of a group file from its csv.DictReader rows
+    members = []
+    for row in rows:
+        members.append(
+            {
+                "id": row.get("id", ""),
+                "firstname": row.get("firstname", ""),
+                "lastname": row.get("lastname", ""),
+            }
+        )
+    return members
+
+
+def _etag(members):
+    return hashlib.sha1(json.dumps(members, sort_keys=True).encode("utf-8")).hexdigest()
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager, nullcontext, ExitStack
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the process-local locks are available
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, exclusive=True):
+    # OS-level advisory lock, shared between all worker processes
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # closing the descriptor releases the lock
+
+
+class RWLock:
+    # Reader/writer lock; waiting writers block new readers so check-ins
+    # can't be starved by a stream of /edit requests.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        # Returns True if the caller had to wait
+        with self._cond:
+            contended = False
+            while self._writer or self._waiting_writers:
+                contended = True
+                self._cond.wait()
+            self._readers += 1
+            return contended
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            contended = False
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    contended = True
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+            return contended
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class LockManager:
+    # Striped reader/writer locks keyed by person id. Requests for different
+    # people only contend if their ids hash to the same stripe.
+    #
+    # With a `lock_dir`, every stripe is additionally backed by a lock file
+    # that is flock()ed, so several worker processes can share the data files.
+
+    def __init__(self, stripes=64, lock_dir=None, name="stripe"):
+        self._stripes = [RWLock() for _ in range(stripes)]
+        self.lock_dir = lock_dir
+        self.name = name
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def _stripe(self, key):
+        # crc32 instead of hash(): the mapping must be the same in every process
+        return zlib.crc32(str(key).encode("utf-8")) % len(self._stripes)
+
+    def _file_lock(self, index, exclusive):
+        if not self.lock_dir:
+            return nullcontext()
+        return file_lock(os.path.join(self.lock_dir, f"{self.name}-{index}.lock"), exclusive)
+
+    @contextmanager
+    def read(self, key):
+        index = self._stripe(key)
+        lock = self._stripes[index]
+        start = time.perf_counter()
+        contended = lock.acquire_read()
+        try:
+            with self._file_lock(index, exclusive=False):
+                self._record("read", time.perf_counter() - start, contended)
+                yield
+        finally:
+            lock.release_read()
+
+    @contextmanager
+    def write(self, key):
+        with self.write_many([key]):
+            yield
+
+    @contextmanager
+    def write_many(self, keys):
+        # Always lock stripes in ascending order to avoid deadlocks
+        indices = sorted({self._stripe(key) for key in keys})
+        yield from self._write_stripes(indices)
+
+    @contextmanager
+    def write_all(self):
+        # Exclusive access to every stripe, e.g. to remove all log files
+        yield from self._write_stripes(range(len(self._stripes)))
+
+    def _write_stripes(self, indices):
+        acquired = []
+        start = time.perf_counter()
+        contended = False
+        with ExitStack() as file_locks:
+            try:
+                for index in indices:
+                    contended |= self._stripes[index].acquire_write()
+                    acquired.append(index)
+                    file_locks.enter_context(self._file_lock(index, exclusive=True))
+                self._record("write", time.perf_counter() - start, contended)
+                yield
+            finally:
+                file_locks.close()
+                for index in reversed(acquired):
+                    self._stripes[index].release_write()
+
+    def _record(self, mode, waited, contended):
+        with self._stats_lock:
+            s = self._stats[mode]
+            s["acquisitions"] += 1
+            if contended:
+                s["contended"] += 1
+            s["wait_total_ms"] += waited * 1000
+            s["wait_max_ms"] = max(s["wait_max_ms"], waited * 1000)
+
+    def stats(self):
+        with self._stats_lock:
+            result = {}
+            for mode, s in self._stats.items():
+                result[mode] = dict(s)
+                result[mode]["wait_avg_ms"] = s["wait_total_ms"] / s["acquisitions"] if s["acquisitions"] else 0
+            result["stripes"] = len(self._stripes)
+            return result
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {
+                mode: {"acquisitions": 0, "contended": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+                for mode in ("read", "write")
+            }
@@ -0,0 +1,173 @@
+import os
+import csv
+import threading
+from collections import OrderedDict
+
+
+def read_lines_backwards(path, start, end, block_size=16 * 1024):
+    # Yields (offset, line) for the lines between the byte offsets start and
+    # end, last line first. Only the blocks that are actually consumed are
+    # read from disk.
+    with open(path, "rb") as f:
+        pos = end
+        rest = b""
+        while pos > start:
+            size = min(block_size, pos - start)
+            pos -= size
+            f.seek(pos)
+            data = f.read(size) + rest
+            lines = data.split(b"\n")
+            rest = lines[0]  # may be incomplete until the previous block is read
+            line_end = pos + len(data)
+            for line in reversed(lines[1:]):
+                line_start = line_end - len(line)
+                line_end = line_start - 1  # before the newline
+                line = line.rstrip(b"\r")
+                if line:
+                    yield line_start, line.decode("utf-8")
+        rest = rest.rstrip(b"\r")
+        if rest:
+            yield start, rest.decode("utf-8")
+
+
+def parse_rows(data, start, header):
+    # (offset, row) of the complete lines in data, which was read from byte
+    # offset start; the offset tells journal records which rows they apply to
+    offsets, lines = [], []
+    pos = start
+    for line in data.split(b"\n")[:-1]:
+        if line.strip():
+            offsets.append(pos)
+            lines.append(line.rstrip(b"\r").decode("utf-8"))
+        pos += len(line) + 1
+    return list(zip(offsets, csv.DictReader(lines, fieldnames=header)))
+
+
+def read_log(path):
+    # (header, [(offset, row), ...]) of a whole log file, (None, []) if there is none
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None, []
+    header_end = data.find(b"\n") + 1
+    if not header_end:
+        return None, []
+    header = next(csv.reader([data[:header_end].decode("utf-8")]))
+    return header, parse_rows(data[header_end:], header_end, header)
+
+
+class _FileIndex:
+    def __init__(self, st):
+        self.ino = st.st_ino
+        self.size = 0          # bytes scanned so far
+        self.mtime_ns = st.st_mtime_ns
+        self.header = None
+        self.data_start = 0    # first byte after the header
+        self.days = {}         # "YYYY-MM-DD" -> [[start, end], ...] byte ranges
+        self.last_day = None
+
+
+class DateIndex:
+    # In-memory index mapping the dates of a log file to byte ranges, so a
+    # single day can be read without parsing the whole history.
+    #
+    # The index is built lazily on first access and kept in sync with the file:
+    # appended rows (same inode, larger size) are scanned incrementally, any
+    # other change (compaction, removal) triggers a rebuild.
+
+    def __init__(self, max_files=1024):
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # path -> _FileIndex, least recently used first
+
+    def _get(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._files.pop(path, None)
+            return None
+
+        with self._lock:
+            index = self._files.pop(path, None)
+            if index is not None and not (
+                index.ino == st.st_ino
+                and (st.st_size > index.size or (st.st_size == index.size and st.st_mtime_ns == index.mtime_ns))
+            ):
+                index = None  # replaced or rewritten in place
+            if index is None:
+                index = _FileIndex(st)
+            if st.st_size > index.size:
+                self._scan(path, index)
+                index.mtime_ns = st.st_mtime_ns
+            self._files[path] = index
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+            return index
+
+    @staticmethod
+    def _scan(path, index):
+        with open(path, "rb") as f:
+            f.seek(index.size)
+            pos = index.size
+            for line in f:
+                start = pos
+                pos += len(line)
+                if not line.endswith(b"\n"):
+                    pos = start  # incomplete last line, pick it up next time
+                    break
+                if index.header is None:
+                    index.header = next(csv.reader([line.decode("utf-8")]))
+                    index.data_start = pos
+                    continue
+                # the timestamp is the last column: "YYYY-MM-DD HH:MM:SS"
+                day = line.rstrip(b"\r\n").rsplit(b",", 1)[-1][:10].decode("utf-8", "replace")
+                ranges = index.days.setdefault(day, [])
+                if day == index.last_day and ranges and ranges[-1][1] == start:
+                    ranges[-1][1] = pos
+                else:
+                    ranges.append([start, pos])
+                index.last_day = day
+            index.size = pos
+
+    def read_days(self, path, days):
+        # (offset, row) of the rows of the given dates, in file order
+        index = self._get(path)
+        if index is None or index.header is None:
+            return []
+        with self._lock:
+            ranges = sorted(r for day in days for r in index.days.get(day, []))
+            header = index.header
+        rows = []
+        with open(path, "rb") as f:
+            for start, end in ranges:
+                f.seek(start)
+                rows.extend(parse_rows(f.read(end - start), start, header))
+        return rows
+
+    def tail(self, path, before_day=None, until=None):
+        # (header, data_start, end) for reading the file backwards. With
+        # before_day, `end` is the end of the last block dated on/before that day,
+        # which skips everything newer. The file has to be in chronological
+        # order up to `until` (the whole file if None); end is at most until.
+        if before_day is None:
+            # the first page doesn't need the index at all
+            try:
+                with open(path, "rb") as f:
+                    header_line = f.readline()
+                    end = os.fstat(f.fileno()).st_size
+            except FileNotFoundError:
+                return None
+            if not header_line.endswith(b"\n"):
+                return None
+            return next(csv.reader([header_line.decode("utf-8")])), len(header_line), end
+
+        index = self._get(path)
+        if index is None or index.header is None:
+            return None
+        with self._lock:
+            limit = index.size if until is None else max(until, index.data_start)
+            end = max((min(r[1], limit) for day, ranges in index.days.items() if day <= before_day
+                       for r in ranges if r[0] < limit), default=index.data_start)
+            return index.header, index.data_start, end
@@ -0,0 +1,44 @@
+import os
+import sys
+import argparse
+
+from storage import CsvStorage, LOG_HEADER
+from sqlite_storage import SqliteStorage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# Imports the CSV logs (data/log, including the edit journal) into the SQLite
+# database. Run it with the server stopped, then set STORAGE_BACKEND = "sqlite"
+# in app.py. The CSV files are left untouched.
+
+
+def migrate(source, target):
+    # returns (persons, rows)
+    persons = rows = 0
+    for person_id in source.person_ids():
+        entries = source.read_entries(person_id)
+        if not entries:
+            continue
+        target.append([(person_id, [entry[field] for field in LOG_HEADER]) for entry in entries])
+        persons += 1
+        rows += len(entries)
+    return persons, rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV-Logs in die SQLite-Datenbank übernehmen")
+    parser.add_argument("--db", default=os.path.join(DATA_DIR, "presence.db"),
+                        help="Pfad der SQLite-Datenbank")
+    parser.add_argument("--force", action="store_true",
+                        help="auch in eine Datenbank mit vorhandenen Einträgen importieren")
+    args = parser.parse_args()
+
+    source = CsvStorage(os.path.join(DATA_DIR, "log"), os.path.join(DATA_DIR, "journal"),
+                        os.path.join(DATA_DIR, "locks"), os.path.join(DATA_DIR, "index"))
+    target = SqliteStorage(args.db, os.path.join(DATA_DIR, "cache", "logs"))
+    if target.person_ids() and not args.force:
+        sys.exit(f"Die Datenbank {args.db} enthält bereits Einträge (--force zum Importieren trotzdem).")
+
+    persons, rows = migrate(source, target)
+    print(f"{rows} Einträge von {persons} Personen nach {args.db} übernommen.")
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+EXIT_STATUS = "ausgetreten"
+ENTRY_STATUS = "eingetreten"
+MAX_PAIR_DURATION = pd.Timedelta(minutes=20)
+HISTO_TIMES = list(range(21))  # 0 to 20 minutes
+
+
+def pair_events(df, max_duration=MAX_PAIR_DURATION):
+    # Matches exits with entries. `df` needs 'status' and 'timestamp' columns
+    # and must be sorted by timestamp.
+    #
+    # Rule: every exit (in chronological order) takes the earliest entry that
+    # hasn't been taken yet and lies within (0, max_duration] after it.
+    # Entries older than an exit can't be taken by any later exit either, so one
+    # pointer sweep over the entries is enough: O(n log n) instead of O(n²).
+    #
+    # Returns a DataFrame with one row per pair: positions and index labels of
+    # both rows in `df`, both timestamps and the duration in seconds.
+    statuses = df["status"].to_numpy()
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+    exit_pos = np.flatnonzero(statuses == EXIT_STATUS)
+    entry_pos = np.flatnonzero(statuses == ENTRY_STATUS)
+    exit_ts = ts[exit_pos]
+    entry_ts = ts[entry_pos]
+    # first entry strictly after each exit
+    first_candidate = np.searchsorted(entry_ts, exit_ts, side="right")
+
+    max_ns = max_duration.value
+    entry_ts_list = entry_ts.tolist()
+    n_entries = len(entry_ts_list)
+    paired_exits, paired_entries = [], []
+    q = 0  # next entry that is still free
+    for k, (start, t_exit) in enumerate(zip(first_candidate.tolist(), exit_ts.tolist())):
+        if q < start:
+            q = start
+        if q < n_entries and entry_ts_list[q] - t_exit <= max_ns:
+            paired_exits.append(k)
+            paired_entries.append(q)
+            q += 1
+
+    exit_rows = exit_pos[paired_exits]
+    entry_rows = entry_pos[paired_entries]
+    exit_times = ts[exit_rows]
+    entry_times = ts[entry_rows]
+    return pd.DataFrame({
+        "exit_pos": exit_rows,
+        "entry_pos": entry_rows,
+        "exit_index": df.index.to_numpy()[exit_rows],
+        "entry_index": df.index.to_numpy()[entry_rows],
+        "exit_time": pd.to_datetime(exit_times),
+        "entry_time": pd.to_datetime(entry_times),
+        "duration": (entry_times - exit_times) / 1e9,
+    })
+
+
+def pair_rows(df, pairs):
+    # The paired rows of `df`, as exit/entry, exit/entry, ...
+    positions = np.column_stack([pairs["exit_pos"], pairs["entry_pos"]]).ravel()
+    return df.iloc[positions]
+
+
+def pair_statistics(pairs, bins=HISTO_TIMES):
+    # Count, total and average duration (seconds) plus the histogram of the
+    # durations in minutes
+    durations = pairs["duration"].to_numpy(dtype=float)
+    count = len(durations)
+    total_seconds = float(durations.sum())
+    durations_min = durations / 60
+    histogram, _ = np.histogram(durations_min, bins=bins)
+    return {
+        "count": count,
+        "total_seconds": total_seconds,
+        "average_seconds": total_seconds / count if count else 0,
+        "durations_min": durations_min,
+        "histogram": histogram,
+        "bins": list(bins),
+    }
@@ -0,0 +1,200 @@
+import os
+import csv
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+CLEAR = "*"  # feed record: all logs were deleted
+
+
+class PresenceMap:
+    # Current state of every person (id -> {"status", "timestamp", "initials",
+    # "group"} of the newest entry), kept in memory so the check-in page can
+    # show who is out without reading logs.
+    #
+    # Built from the tail of every log on first use (`load` yields
+    # (person_id, row) from the stored entries). The routes publish every
+    # change, after storing it, by appending the new state to `feed_path`;
+    # each worker process (the writer included) replays the feed from its
+    # last offset before answering, so all apply the changes in the same
+    # order. Publishing only appends, it never waits for or runs a rebuild.
+    # The feed is a series of numbered files (`<feed>.<n>`), a new one is
+    # started at `max_feed_bytes` and the one before the previous is removed;
+    # a process that falls further behind simply rebuilds.
+
+    def __init__(self, feed_path, lock_path, load, max_feed_bytes=4 * 1024 * 1024):
+        self.feed_path = feed_path
+        self.lock_path = lock_path
+        self.load = load
+        self.max_feed_bytes = max_feed_bytes
+        self._pid = None
+        self._lock = threading.Lock()
+        self._states = None
+        self._feed_gen = None
+        self._feed_offset = 0
+        self._listeners = []
+
+    def add_listener(self, listener):
+        # listener(person_id, state or None) for every applied change, in feed
+        # order; listener(None, None) when the whole map was replaced. Called
+        # with the map locked, so it must not block.
+        self._listeners.append(listener)
+
+    def _notify(self, person_id, state):
+        for listener in self._listeners:
+            listener(person_id, state)
+
+    # ---------- reading ----------
+    def get(self, person_ids):
+        # {person_id: state} of the given persons that have entries
+        with self._synced():
+            return {person_id: self._states[person_id] for person_id in person_ids if person_id in self._states}
+
+    def sync(self):
+        # builds the map on first use, afterwards catches up with the feed
+        with self._synced():
+            pass
+
+    @contextmanager
+    def _synced(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked: build this process's own map
+                self._pid = os.getpid()
+                self._states = None
+            if self._states is None:
+                self._rebuild()
+            else:
+                self._catch_up()
+            yield
+
+    def _rebuild(self):
+        # remember the feed position first: changes made during the scan are
+        # replayed afterwards
+        with self._feed_lock():
+            self._feed_gen = self._newest_gen()
+            self._feed_offset = os.path.getsize(self._feed(self._feed_gen))
+        states = {}
+        for person_id, row in self.load():
+            states[person_id] = _state(row)
+        self._states = states
+        self._notify(None, None)
+        self._catch_up()
+
+    def _catch_up(self, rebuild=True):
+        while True:
+            path = self._feed(self._feed_gen)
+            # a rotation finishes the old file first: if the next one exists
+            # before reading, the current one is complete
+            rotated = os.path.exists(self._feed(self._feed_gen + 1))
+            try:
+                if os.path.getsize(path) > self._feed_offset:
+                    self._feed_offset = self._replay(path, self._feed_offset)
+            except FileNotFoundError:
+                # fell behind more than one rotation
+                if rebuild:
+                    self._rebuild()
+                else:
+                    self._states = None  # left to the next reader
+                return
+            if not rotated:
+                return
+            self._feed_gen += 1
+            self._feed_offset = 0
+
+    def _replay(self, path, offset):
+        # applies the complete records after offset, returns the new offset
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a record may still be being written
+        for record in csv.reader(data[:end].decode("utf-8").splitlines()):
+            self._apply(record)
+        return offset + end
+
+    def _apply(self, record):
+        person_id, status, timestamp, initials, group = record
+        if person_id == CLEAR:
+            self._states.clear()
+            self._notify(None, None)
+        elif status:
+            state = {"status": status, "timestamp": timestamp, "initials": initials, "group": group}
+            self._states[person_id] = state
+            self._notify(person_id, state)
+        else:
+            self._states.pop(person_id, None)
+            self._notify(person_id, None)
+
+    # ---------- writing ----------
+    def publish(self, changes):
+        # changes: (person_id, newest row or None if no entries are left)
+        records = [[person_id] + ([row["status"], row["timestamp"], row["initials"], row["group"]] if row else ["", "", "", ""])
+                   for person_id, row in changes]
+        self._write(records)
+
+    def clear(self):
+        self._write([[CLEAR, "", "", "", ""]])
+
+    def _write(self, records):
+        if not records:
+            return
+        # only the append (and rotation) holds the feed lock
+        with self._feed_lock():
+            gen = self._newest_gen(self._feed_gen)
+            with open(self._feed(gen), "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(records)
+                size = f.tell()
+            if size > self.max_feed_bytes:
+                open(self._feed(gen + 1), "a").close()
+                try:
+                    os.remove(self._feed(gen - 1))
+                except FileNotFoundError:
+                    pass
+        # applied via the feed, in the same order as in the other processes;
+        # right away if the map is built and free, otherwise by the readers
+        if self._lock.acquire(blocking=False):
+            try:
+                if self._pid == os.getpid() and self._states is not None:
+                    self._catch_up(rebuild=False)
+            finally:
+                self._lock.release()
+
+    def _feed(self, gen):
+        return f"{self.feed_path}.{gen}"
+
+    def _newest_gen(self, known=None):
+        # call with the feed lock held; creates the first feed file. known is
+        # a generation seen before, only used if its file is still there.
+        if known is None or not os.path.exists(self._feed(known)):
+            directory, prefix = os.path.split(self.feed_path)
+            os.makedirs(directory, exist_ok=True)
+            gens = [int(name[len(prefix) + 1:]) for name in os.listdir(directory)
+                    if name.startswith(prefix + ".") and name[len(prefix) + 1:].isdigit()]
+            if not gens:
+                open(self._feed(0), "a").close()
+                return 0
+            known = max(gens)
+        while os.path.exists(self._feed(known + 1)):
+            known += 1
+        return known
+
+    @contextmanager
+    def _feed_lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+
+def _state(row):
+    return {"status": row["status"], "timestamp": row["timestamp"], "initials": row["initials"], "group": row["group"]}
@@ -0,0 +1,116 @@
+import os
+import json
+import queue
+import threading
+import time
+
+RESET = object()  # queue item: the presence map was replaced, send a new snapshot
+
+
+class _Subscriber:
+    def __init__(self, group, member_ids, queue_size):
+        self.group = group
+        self.member_ids = member_ids
+        self.queue = queue.Queue(queue_size)
+        self.evicted = False
+
+
+class PresenceHub:
+    # Pushes presence changes to the open check-in pages (server-sent events),
+    # per group.
+    #
+    # Fed by the PresenceMap listener: changes made in this process arrive
+    # right away, those of the other worker processes when the poller catches
+    # up with the shared feed (every `poll_interval` seconds, only while
+    # someone is subscribed). Each client has a bounded queue; a client that
+    # doesn't keep up is evicted instead of being buffered without limit, its
+    # browser reconnects and starts over with a snapshot. An idle client costs
+    # a blocked thread and a heartbeat comment every `heartbeat` seconds.
+
+    def __init__(self, presence, max_clients=500, queue_size=256, heartbeat=15, poll_interval=0.5):
+        self.presence = presence
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._poller_pid = None
+        self._stats = {"evicted": 0, "rejected": 0}
+        presence.add_listener(self._on_change)
+
+    def subscribe(self, group, member_ids):
+        # None if the process already serves max_clients
+        with self._lock:
+            if self._poller_pid != os.getpid():
+                # one poller per (forked) worker process
+                self._poller_pid = os.getpid()
+                self._subscribers = set()
+                threading.Thread(target=self._poll, daemon=True).start()
+            if len(self._subscribers) >= self.max_clients:
+                self._stats["rejected"] += 1
+                return None
+            subscriber = _Subscriber(group, member_ids, self.queue_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, clients=len(self._subscribers))
+
+    def _on_change(self, person_id, state):
+        # runs with the presence map locked: never blocks
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if person_id is None:
+                item = RESET
+            elif person_id in subscriber.member_ids:
+                item = (person_id, state)
+            else:
+                continue
+            try:
+                subscriber.queue.put_nowait(item)
+            except queue.Full:
+                # slow consumer: drop it, the stream ends once it catches up
+                subscriber.evicted = True
+                with self._lock:
+                    if subscriber in self._subscribers:
+                        self._subscribers.discard(subscriber)
+                        self._stats["evicted"] += 1
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                idle = not self._subscribers
+            if idle:
+                continue
+            try:
+                self.presence.sync()
+            except Exception as e:
+                print(f"[Presence Warning] {e}")
+
+    def stream(self, subscriber):
+        # "snapshot" with the states of all members first (and again after a
+        # reset), then one "presence" event per change
+        def snapshot():
+            data = json.dumps({"presence": self.presence.get(subscriber.member_ids)})
+            return f"event: snapshot\ndata: {data}\n\n"
+
+        yield snapshot()
+        while not subscriber.evicted:
+            try:
+                item = subscriber.queue.get(timeout=self.heartbeat)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            if item is RESET:
+                yield snapshot()
+            else:
+                person_id, state = item
+                yield f"event: presence\ndata: {json.dumps({'id': person_id, 'state': state})}\n\n"
@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import uuid
+
+CACHE_VERSION = 1  # bump when the report layout changes
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ReportCache:
+    # Content-addressed on-disk cache for generated reports.
+    #
+    # The key covers everything a report depends on: the source CSV (size,
+    # mtime and content hash), the full_report flag, the name fields, the
+    # timeslot definition and the chart backend. Entries are evicted least
+    # recently used first once the cache exceeds max_bytes or max_entries.
+    # Writes go through temp file + rename, so worker processes can share it.
+
+    def __init__(self, cache_dir, timeslots_path, max_bytes=256 * 1024 * 1024, max_entries=2000):
+        self.cache_dir = cache_dir
+        self.timeslots_path = timeslots_path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hashes = {}  # (path, size, mtime_ns, ino) -> content hash
+        self.hits = 0
+        self.misses = 0
+
+    def _content_hash(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return "missing"
+        signature = (path, st.st_size, st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            cached = self._hashes.get(signature)
+        if cached is None:
+            cached = _file_hash(path)
+            with self._lock:
+                if len(self._hashes) > 10000:
+                    self._hashes.clear()
+                self._hashes[signature] = cached
+        return f"{st.st_size}:{st.st_mtime_ns}:{cached}"
+
+    def key(self, task):
+        if "tasks" in task:
+            # combined group report: the keys of all sections, in order
+            parts = [CACHE_VERSION, "group", task.get("title", ""), [self.key(t) for t in task["tasks"]],
+                     task.get("chart_backend")]
+            return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+        parts = [
+            CACHE_VERSION,
+            self._content_hash(task["input_csv_path"]),
+            bool(task.get("full_report", True)),
+            task.get("firstname", ""),
+            task.get("lastname", ""),
+            self._content_hash(self.timeslots_path),
+            task.get("chart_backend"),
+        ]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def fetch(self, key, dest_dir):
+        # Copy of the cached report in dest_dir (callers move/delete their PDFs)
+        pdf_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            dest = os.path.join(dest_dir, f"{uuid.uuid4().hex}.pdf")
+            try:
+                os.link(pdf_path, dest)
+            except OSError:
+                shutil.copyfile(pdf_path, dest)
+            os.utime(pdf_path)  # mark as recently used
+        except (FileNotFoundError, ValueError):
+            return None
+        return {'status': 'OK', 'pdf_path': dest, 'filename': meta["filename"]}
+
+    def store(self, key, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pdf_path, meta_path = self._paths(key)
+        tmp = f"{pdf_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(result["pdf_path"], tmp)
+        os.replace(tmp, pdf_path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"filename": result.get("filename", "report")}, f)
+        os.replace(tmp, meta_path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".pdf"):
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, filename))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename[:-4]))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, key = entries.pop(0)
+            total -= size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def generate(self, tasks, generate, dest_dir, progress=None):
+        # Like generate(tasks), but unchanged reports are served from the cache.
+        # progress(index, result) as in ReportPool.generate.
+        os.makedirs(dest_dir, exist_ok=True)
+        keys = [self.key(task) for task in tasks]
+        results = [self.fetch(key, dest_dir) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        with self._lock:
+            self.hits += len(tasks) - len(missing)
+            self.misses += len(missing)
+        if progress:
+            for i, result in enumerate(results):
+                if result is not None:
+                    progress(i, result)
+
+        if missing:
+            def on_result(position, result):
+                if progress:
+                    progress(missing[position], result)
+
+            for i, result in zip(missing, generate([tasks[i] for i in missing], progress=on_result)):
+                results[i] = result
+                if result["status"] == "OK":
+                    try:
+                        self.store(keys[i], result)
+                    except OSError as e:
+                        print(f"[Cache Warning] Could not store report: {e}")
+        return results
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0}
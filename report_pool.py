@@ -0,0 +1,187 @@
+import os
+import time
+import signal
+import itertools
+import threading
+import multiprocessing
+from functools import partial
+
+KILL_GRACE = 10  # seconds after its deadline before a stuck worker is killed
+
+_started = None  # queue of (key, pid) in the workers, see _init_worker
+
+
+class _Deadline(BaseException):
+    # not an Exception: the generators' own error handling must not catch it
+    pass
+
+
+def _init_worker(nice, started):
+    # pandas/reportlab are only ever imported here, in the pool processes
+    import report_generator
+
+    global _started
+    _started = started
+
+    # lower priority: the scheduler prefers the server's check-in threads
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _on_deadline(signum, frame):
+    raise _Deadline()
+
+
+def _run(key, func, task, timeout):
+    import report_generator
+    _started.put((key, os.getpid()))
+    # the deadline counts from the start of the task, not from the submit
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_deadline)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return getattr(report_generator, func)(**task)
+    except _Deadline:
+        return {'status': 'ERROR', 'message': 'Timeout'}
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _ping(_):
+    return os.getpid()
+
+
+def _remove_output(result):
+    if result.get('status') == 'OK':
+        try:
+            os.remove(result['pdf_path'])
+        except OSError:
+            pass
+
+
+class ReportPool:
+    # Runs generate_report in a pool of worker processes (matplotlib is not
+    # thread-safe and the rendering is CPU bound). The pool is created lazily,
+    # once per server process, with a fresh interpreter per worker ("spawn"),
+    # so no locks or threads of the server are inherited.
+    #
+    # Every task has task_timeout seconds from the moment a worker starts it
+    # (time spent waiting in the queue does not count). The worker stops the
+    # task itself at the deadline; one that does not react within KILL_GRACE
+    # is killed and the pool starts a replacement. Results that arrive after
+    # their request gave up are deleted.
+
+    def __init__(self, workers=None, task_timeout=120, nice=10):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.task_timeout = task_timeout
+        self.nice = nice
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._keys = itertools.count()
+        self._changed = threading.Condition()
+        self._waiting = set()   # keys of submitted tasks whose request still waits
+        self._running = {}      # key -> (worker pid, start time)
+        self._results = {}      # key -> result, until the request picks it up
+        self._abandoned = set() # keys whose request gave up, output is deleted
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                ctx = multiprocessing.get_context("spawn")
+                started = ctx.SimpleQueue()
+                self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(self.nice, started))
+                self._pool_pid = os.getpid()
+                self._changed = threading.Condition()
+                self._waiting, self._running, self._results, self._abandoned = set(), {}, {}, set()
+                threading.Thread(target=self._watch_starts, args=(started,), daemon=True).start()
+            return self._pool
+
+    def _watch_starts(self, started):
+        while True:
+            key, pid = started.get()
+            with self._changed:
+                if key in self._waiting:
+                    self._running[key] = (pid, time.monotonic())
+                    self._changed.notify_all()
+
+    def _deliver(self, key, result):
+        with self._changed:
+            if key in self._abandoned:
+                self._abandoned.discard(key)
+                _remove_output(result)
+                return
+            self._results[key] = result
+            self._changed.notify_all()
+
+    def generate(self, tasks, func="generate_report", progress=None):
+        # tasks: list of keyword arguments for report_generator.<func>. Returns
+        # the results in the same order; failed or timed out tasks get an ERROR status.
+        # progress(index, result) is called as soon as each result is in.
+        pool = self._get_pool()
+        keys = []
+        for task in tasks:
+            key = next(self._keys)
+            with self._changed:
+                self._waiting.add(key)
+            pool.apply_async(_run, (key, func, task, self.task_timeout),
+                             callback=partial(self._deliver, key),
+                             error_callback=lambda e, key=key: self._deliver(key, {'status': 'ERROR', 'message': str(e)}))
+            keys.append(key)
+        results = []
+        try:
+            for key in keys:
+                results.append(self._wait(key))
+                if progress:
+                    progress(len(results) - 1, results[-1])
+        except BaseException:
+            # nobody gets the results of a failed request
+            for result in results:
+                _remove_output(result)
+            for key in keys[len(results):]:
+                self._give_up(key)
+            raise
+        return results
+
+    def _wait(self, key):
+        with self._changed:
+            while key not in self._results:
+                if key in self._running:
+                    pid, started = self._running[key]
+                    left = started + self.task_timeout + KILL_GRACE - time.monotonic()
+                    if left <= 0:
+                        # stuck in code that never returns to the interpreter
+                        try:
+                            os.kill(pid, signal.SIGTERM)
+                        except OSError:
+                            pass
+                        self._waiting.discard(key)
+                        self._running.pop(key, None)
+                        return {'status': 'ERROR', 'message': 'Timeout'}
+                    self._changed.wait(left)
+                else:
+                    self._changed.wait()
+            self._waiting.discard(key)
+            self._running.pop(key, None)
+            return self._results.pop(key)
+
+    def _give_up(self, key):
+        with self._changed:
+            self._waiting.discard(key)
+            self._running.pop(key, None)
+            if key in self._results:
+                _remove_output(self._results.pop(key))
+            else:
+                self._abandoned.add(key)
+
+    def warm_up(self):
+        # Start the workers and wait until they have imported the report modules
+        pool = self._get_pool()
+        pool.map(_ping, range(self.workers))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.close()
+            self._pool = None
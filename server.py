@@ -0,0 +1,72 @@
+import os
+import signal
+import socket
+import sys
+from werkzeug.serving import make_server
+
+
+def serve_production(app, host, port, workers, on_worker_start=None):
+    # Pre-fork server: the parent binds the port once, every worker process runs
+    # a threaded WSGI server on the shared socket and the kernel distributes the
+    # connections. Workers that die are restarted. on_worker_start(index) is
+    # called in every worker once its server is set up, index is its slot
+    # (0 .. workers-1, kept by a restarted worker).
+    if not hasattr(os, "fork"):
+        print("Der Produktionsmodus benötigt fork(), starte mit einem Prozess.", file=sys.stderr)
+        server = make_server(host, port, app, threaded=True)
+        if on_worker_start:
+            on_worker_start(0)
+        server.serve_forever()
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    children = {}  # pid -> slot
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+                if on_worker_start:
+                    on_worker_start(index)
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        spawn(index)
+    print(f" * Running on http://{host}:{port} with {workers} worker processes")
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if not stopping and index is not None:
+            print(f"[Server Warning] Worker {pid} exited, restarting", file=sys.stderr)
+            spawn(index)
+    sock.close()
@@ -0,0 +1,231 @@
+import os
+import io
+import csv
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from storage import Storage, LOG_HEADER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    person_id TEXT NOT NULL,
+    initials TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    lastname TEXT NOT NULL,
+    firstname TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_person_time ON events (person_id, timestamp);
+CREATE INDEX IF NOT EXISTS events_group_time ON events (grp, timestamp);
+"""
+# table columns in LOG_HEADER order
+COLUMNS = ["initials", "grp", "person_id", "lastname", "firstname", "status", "timestamp"]
+SELECT = f"SELECT {', '.join(COLUMNS)} FROM events"
+# fields an edit has to match (cf. edit_journal.MATCH_FIELDS)
+MATCH = "person_id = ? AND initials = ? AND grp = ? AND lastname = ? AND firstname = ? AND status = ? AND timestamp = ?"
+
+
+def _match_args(person_id, target):
+    return [person_id] + [target[field] for field in ("initials", "group", "lastname", "firstname", "status", "timestamp")]
+
+
+def _row(cursor, values):
+    return dict(zip(LOG_HEADER, values))
+
+
+def _next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+class SqliteStorage(Storage):
+    # All events in one SQLite database in WAL mode (readers don't block the
+    # writer, several worker processes can share it). Indexed on
+    # (person, time) for the per-person views and on (group, time) for
+    # queries across students. Import existing logs with migrate_to_sqlite.py.
+
+    def __init__(self, db_path, export_dir, synchronous="FULL", pool_size=8):
+        self.db_path = db_path
+        self.export_dir = export_dir  # materialized CSV logs for reports/exports
+        self.synchronous = synchronous
+        self.pool_size = pool_size
+        self._pool = []
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(SCHEMA)
+        conn.row_factory = _row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        # small pool of connections, per (forked) process
+        with self._lock:
+            if self._pool_pid != os.getpid():
+                self._pool, self._pool_pid = [], os.getpid()
+            conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            if len(self._pool) < self.pool_size and self._pool_pid == os.getpid():
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+
+    # ---------- writing ----------
+    def append(self, rows):
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(values[0], values[1], person_id, values[3], values[4], values[5], values[6])
+                 for person_id, values in rows])
+
+    def delete(self, person_id, target):
+        # removes every row that matches *totally*, like the CSV journal
+        with self._transaction() as conn:
+            return conn.execute(f"DELETE FROM events WHERE {MATCH}", _match_args(person_id, target)).rowcount > 0
+
+    def update(self, person_id, orig, new):
+        with self._transaction() as conn:
+            return conn.execute(
+                f"UPDATE events SET status = ?, timestamp = ? WHERE seq = "
+                f"(SELECT seq FROM events WHERE {MATCH} ORDER BY timestamp, seq LIMIT 1)",
+                [new["status"], new["timestamp"]] + _match_args(person_id, orig)).rowcount > 0
+
+    def delete_all(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM events")
+        if os.path.isdir(self.export_dir):
+            for filename in os.listdir(self.export_dir):
+                os.remove(os.path.join(self.export_dir, filename))
+
+    # ---------- reading ----------
+    def exists(self, person_id):
+        with self._connection() as conn:
+            return conn.execute("SELECT 1 FROM events WHERE person_id = ? LIMIT 1", (person_id,)).fetchone() is not None
+
+    def read_entries(self, person_id):
+        # chronological; a CSV log is in append order and re-sorted after edits
+        with self._connection() as conn:
+            return conn.execute(f"{SELECT} WHERE person_id = ? ORDER BY timestamp, seq", (person_id,)).fetchall()
+
+    def read_days(self, person_id, days):
+        rows = []
+        with self._connection() as conn:
+            for day in sorted(days):
+                try:
+                    end = _next_day(day)
+                except ValueError:
+                    continue
+                rows += conn.execute(
+                    f"{SELECT} WHERE person_id = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp, seq",
+                    (person_id, day, end)).fetchall()
+        return rows
+
+    def read_page(self, person_id, limit, before=None, skip=0):
+        # same cursor as the CSV backend: timestamp of the oldest delivered row
+        # and the number of delivered rows with exactly that timestamp
+        with self._connection() as conn:
+            if before is None:
+                rows = conn.execute(f"{SELECT} WHERE person_id = ? ORDER BY timestamp DESC, seq DESC LIMIT ?",
+                                    (person_id, limit + 1)).fetchall()
+                skip = 0
+            else:
+                rows = conn.execute(
+                    f"{SELECT} WHERE person_id = ? AND timestamp <= ? ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?",
+                    (person_id, before, limit + 1, skip)).fetchall()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]["timestamp"]
+        at_last = sum(1 for row in rows if row["timestamp"] == last)
+        return rows, {"before": last, "skip": at_last + (skip if last == before else 0)}
+
+    def query_events(self, start, end, group=None, initials=None, status=None, limit=100, offset=0):
+        # served by the (grp, timestamp) index
+        where, args = ["timestamp >= ?", "timestamp < ?"], [start, end]
+        for column, value in (("grp", group), ("initials", initials), ("status", status)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"{SELECT} WHERE {' AND '.join(where)} ORDER BY timestamp, person_id, seq LIMIT ? OFFSET ?",
+                args + [limit + 1, offset]).fetchall()
+        if len(rows) <= limit:
+            return rows, None
+        return rows[:limit], offset + limit
+
+    def person_ids(self):
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            return [person_id for (person_id,) in cursor.execute("SELECT DISTINCT person_id FROM events ORDER BY person_id")]
+
+    def last_entries(self):
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM (SELECT *, ROW_NUMBER() OVER "
+                f"(PARTITION BY person_id ORDER BY timestamp DESC, seq DESC) AS n FROM events) WHERE n = 1").fetchall()
+        return [(row["id"], row) for row in rows]
+
+    # ---------- exports ----------
+    def _csv_bytes(self, person_id):
+        rows = self.read_entries(person_id)
+        if not rows:
+            return None
+        out = io.StringIO(newline="")
+        writer = csv.DictWriter(out, fieldnames=LOG_HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue().encode("utf-8")
+
+    def csv_path(self, person_id):
+        # Rewritten only when the content changed, so the report cache (keyed on
+        # the file) keeps hitting for unchanged logs
+        path = os.path.join(self.export_dir, f"{person_id}.csv")
+        data = self._csv_bytes(person_id)
+        if data is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return path
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return path
+        except FileNotFoundError:
+            pass
+        os.makedirs(self.export_dir, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+    def archive_members(self):
+        for person_id in self.person_ids():
+            data = self._csv_bytes(person_id)
+            if data is not None:
+                yield f"{person_id}.csv", data
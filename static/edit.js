@@ -9,27 +9,98 @@ function markChanged(row) {
 }
 
 /* --- Events beim Laden zuweisen --- */
+function bindRow(row) {
+  const sel = row.querySelector(".statusSel");
+  if (!sel) return; // Kopfzeile
+  sel.addEventListener("change", () => markChanged(row));
+  row.querySelector(".timeInp").addEventListener("input", () => markChanged(row));
+  row.querySelector(".dateInp").addEventListener("input", () => markChanged(row));
+
+  const delIcon = row.querySelector(".delIcon");
+  delIcon.addEventListener("click", () => deleteRow(delIcon));
+
+  const saveIcon = row.querySelector(".saveIcon");
+  saveIcon.addEventListener("click", () => saveRow(saveIcon));
+}
+
 document.addEventListener("DOMContentLoaded", () => {
-  document.querySelectorAll(".statusSel").forEach((sel) => {
-    sel.addEventListener("change", () => markChanged(rowOf(sel)));
-  });
+  document.querySelectorAll("#entryTable tr").forEach(bindRow);
 
-  document.querySelectorAll(".timeInp").forEach((inp) => {
-    inp.addEventListener("input", () => markChanged(rowOf(inp)));
-  });
+  const loadMoreBtn = document.getElementById("loadMoreBtn");
+  if (loadMoreBtn) {
+    loadMoreBtn.addEventListener("click", () => loadMore(loadMoreBtn));
+  }
+});
 
-  document.querySelectorAll(".dateInp").forEach((inp) => {
-    inp.addEventListener("input", () => markChanged(rowOf(inp)));
-  });
+/* -------- weitere Einträge nachladen -------- */
+function escapeHtml(value) {
+  const div = document.createElement("div");
+  div.textContent = value ?? "";
+  return div.innerHTML;
+}
 
-  document.querySelectorAll(".delIcon").forEach((icon) => {
-    icon.addEventListener("click", () => deleteRow(icon));
-  });
+function buildRow(entry) {
+  const [date, time = ""] = entry.timestamp.split(" ");
+  const status = (value) => (entry.status === value ? "selected" : "");
+  const row = document.createElement("tr");
+  row.innerHTML = `
+            <td>
+                <span class="delIcon" title="Löschen">
+                    <i class="fa-solid fa-trash"></i>
+                </span>
+            </td>
+            <td>${escapeHtml(entry.initials)}</td>
+            <td>${escapeHtml(entry.lastname)}</td>
+            <td>${escapeHtml(entry.firstname)}</td>
+            <td>
+                <select class="statusSel">
+                    <option value="eingetreten" ${status("eingetreten")}>eingetreten</option>
+                    <option value="ausgetreten" ${status("ausgetreten")}>ausgetreten</option>
+                </select>
+            </td>
+            <td>
+                <input type="date" class="dateInp" value="${escapeHtml(date)}">
+                <input type="time" class="timeInp" value="${escapeHtml(time.slice(0, 8))}">
+            </td>
+            <td>
+                <i class="fa-solid fa-floppy-disk saveIcon" title="Speichern" style="display: none;"></i>
+            </td>
+            <td class="hidden"></td>`;
+  row.querySelector(".hidden").dataset.original = JSON.stringify(entry);
+  return row;
+}
 
-  document.querySelectorAll(".saveIcon").forEach((icon) => {
-    icon.addEventListener("click", () => saveRow(icon));
+function loadMore(button) {
+  const params = new URLSearchParams({
+    id: button.dataset.id,
+    before: button.dataset.before,
+    skip: button.dataset.skip,
   });
-});
+  button.disabled = true;
+
+  fetch(`/api/entries?${params}`)
+    .then((r) => r.json())
+    .then((res) => {
+      if (res.error) {
+        alert(res.error);
+        return;
+      }
+      const table = document.getElementById("entryTable");
+      res.entries.forEach((entry) => {
+        const row = buildRow(entry);
+        table.appendChild(row);
+        bindRow(row);
+      });
+      if (res.next) {
+        button.dataset.before = res.next.before;
+        button.dataset.skip = res.next.skip;
+      } else {
+        button.remove();
+      }
+    })
+    .catch(() => alert("Laden fehlgeschlagen"))
+    .finally(() => (button.disabled = false));
+}
 
 /* -------- löschen -------- */
 function deleteRow(icon) {
@@ -1,8 +1,52 @@
+// Export runs on the server in the background: start it, follow the progress
+// (server-sent events), then download the finished file
+function runExportJob(fileType, button) {
+  const statusMsg = document.getElementById("statusMsg");
+  statusMsg.innerText = "Export wird gestartet ...";
+  button.disabled = true;
+
+  fetch("/api/export-jobs", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ fileType }),
+  })
+    .then((response) => response.json().then((data) => ({ ok: response.ok, data })))
+    .then(({ ok, data }) => {
+      if (!ok) throw new Error(data.error || "Export konnte nicht gestartet werden.");
+
+      const events = new EventSource(`/api/export-jobs/${data.id}/events`);
+      events.addEventListener("progress", (e) => {
+        const status = JSON.parse(e.data);
+        statusMsg.innerText = status.total
+          ? `Export läuft: ${status.done} / ${status.total}${status.message ? " – " + status.message : ""}`
+          : "Export läuft ...";
+      });
+      events.addEventListener("done", () => {
+        events.close();
+        statusMsg.innerText = "Export abgeschlossen.";
+        button.disabled = false;
+        window.location.href = `/api/export-jobs/${data.id}/download`;
+      });
+      events.addEventListener("error", (e) => {
+        // connection lost without an error event: the browser reconnects
+        if (!e.data && events.readyState !== EventSource.CLOSED) return;
+        events.close();
+        const status = e.data ? JSON.parse(e.data) : {};
+        statusMsg.innerText = `Export fehlgeschlagen${status.error ? ": " + status.error : "."}`;
+        button.disabled = false;
+      });
+    })
+    .catch((err) => {
+      statusMsg.innerText = err.message;
+      button.disabled = false;
+    });
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   const exportLogsBtn = document.getElementById("exportLogsBtn");
   if (exportLogsBtn) {
     exportLogsBtn.addEventListener("click", () => {
-      window.location.href = "/api/export-logs";
+      runExportJob("LOGS", exportLogsBtn);
     });
   }
 });
@@ -11,7 +55,7 @@ document.addEventListener("DOMContentLoaded", () => {
   const exportGroupsBtn = document.getElementById("exportGroupsBtn");
   if (exportGroupsBtn) {
     exportGroupsBtn.addEventListener("click", () => {
-      window.location.href = "/api/export-groups";
+      runExportJob("GROUPS", exportGroupsBtn);
     });
   }
 });
@@ -30,14 +30,33 @@ function loadMembers(group) {
 
   updateFavoriteStar();
 
+  // Send the ETag of the cached roster, the server answers 304 if unchanged
+  const cacheKey = `members:${group}`;
+  const cached = JSON.parse(sessionStorage.getItem(cacheKey) || "null");
+  const headers = {
+    "Content-Type": "application/json",
+  };
+  if (cached) {
+    headers["If-None-Match"] = cached.etag;
+  }
+
   fetch("/get_members", {
     method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
+    headers: headers,
     body: JSON.stringify({ group: group }),
   })
-    .then((response) => response.json())
+    .then((response) => {
+      if (response.status === 304 && cached) {
+        return { members: cached.members };
+      }
+      const etag = response.headers.get("ETag");
+      return response.json().then((data) => {
+        if (etag && data.members) {
+          sessionStorage.setItem(cacheKey, JSON.stringify({ etag: etag, members: data.members }));
+        }
+        return data;
+      });
+    })
     .then((data) => {
       const list = data.members;
       const memberList = document.getElementById("memberList");
@@ -131,14 +150,8 @@ function submitAction(fileType) {
     return;
   }
   
-  if (fileType === "CSV") {
-    downloadFile('/api/exportCSV-group', { fileType, group, selected }, 'export.zip');
-  } 
-  else if (fileType === "ZIP") {
-    downloadFile('/api/export-multiple', { fileType, group, selected }, 'export.zip');
-  } 
-  else if (fileType === "PDF") {
-    downloadFile('/api/export-multiple', { fileType, group, selected }, 'export.pdf');
+  if (["CSV", "ZIP", "PDF"].includes(fileType)) {
+    runExportJob({ fileType, group, selected });
   } 
   else{
     console.log("Filetype not supported!")
@@ -154,26 +167,57 @@ function toggleSelectAllMembersAction() {
   });
 }
 
-function downloadFile(url, payload, filename) {
-    fetch(url, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload)
-    })
-    .then(response => response.blob().then(blob => ({ blob, disposition: response.headers.get("Content-Disposition") })))
-    .then(({ blob, disposition }) => {
-        if (disposition && disposition.includes("filename=")) {
-            const match = disposition.match(/filename\*?=(?:UTF-8'')?["']?([^"';\n]+)["']?/i);
-            if (match && match[1]) filename = decodeURIComponent(match[1]);
-        }
-        const urlObj = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = urlObj;
-        a.download = filename;
+function setExportButtonsDisabled(disabled) {
+  ["pdfExportBtn", "zipExportBtn", "csvExportBtn"].forEach((id) => {
+    document.getElementById(id).disabled = disabled;
+  });
+}
+
+// Export runs on the server in the background: start it, follow the progress
+// (server-sent events), then download the finished file
+function runExportJob(payload) {
+  const statusMsg = document.getElementById("statusMsg");
+  statusMsg.innerText = "Export wird gestartet ...";
+  setExportButtonsDisabled(true);
+
+  fetch("/api/export-jobs", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  })
+    .then((response) => response.json().then((data) => ({ ok: response.ok, data })))
+    .then(({ ok, data }) => {
+      if (!ok) throw new Error(data.error || "Export konnte nicht gestartet werden.");
+
+      const events = new EventSource(`/api/export-jobs/${data.id}/events`);
+      events.addEventListener("progress", (e) => {
+        const status = JSON.parse(e.data);
+        statusMsg.innerText = status.total
+          ? `Export läuft: ${status.done} / ${status.total}${status.message ? " – " + status.message : ""}`
+          : "Export läuft ...";
+      });
+      events.addEventListener("done", () => {
+        events.close();
+        statusMsg.innerText = "Export abgeschlossen.";
+        setExportButtonsDisabled(false);
+        const a = document.createElement("a");
+        a.href = `/api/export-jobs/${data.id}/download`;
         document.body.appendChild(a);
         a.click();
         a.remove();
-        window.URL.revokeObjectURL(urlObj);
+      });
+      events.addEventListener("error", (e) => {
+        // connection lost without an error event: the browser reconnects
+        if (!e.data && events.readyState !== EventSource.CLOSED) return;
+        events.close();
+        const status = e.data ? JSON.parse(e.data) : {};
+        statusMsg.innerText = `Export fehlgeschlagen${status.error ? ": " + status.error : "."}`;
+        setExportButtonsDisabled(false);
+      });
+    })
+    .catch((err) => {
+      statusMsg.innerText = err.message;
+      setExportButtonsDisabled(false);
     });
 }
 
@@ -40,14 +40,33 @@ function loadMembers(group) {
 
   updateFavoriteStar();
 
+  // Send the ETag of the cached roster, the server answers 304 if unchanged
+  const cacheKey = `members:${group}`;
+  const cached = JSON.parse(sessionStorage.getItem(cacheKey) || "null");
+  const headers = {
+    "Content-Type": "application/json",
+  };
+  if (cached) {
+    headers["If-None-Match"] = cached.etag;
+  }
+
   fetch("/get_members", {
     method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
+    headers: headers,
     body: JSON.stringify({ group: group }),
   })
-    .then((response) => response.json())
+    .then((response) => {
+      if (response.status === 304 && cached) {
+        return { members: cached.members };
+      }
+      const etag = response.headers.get("ETag");
+      return response.json().then((data) => {
+        if (etag && data.members) {
+          sessionStorage.setItem(cacheKey, JSON.stringify({ etag: etag, members: data.members }));
+        }
+        return data;
+      });
+    })
     .then((data) => {
       const list = data.members;
       const memberList = document.getElementById("memberList");
@@ -65,7 +84,7 @@ function loadMembers(group) {
 
       let table = `<table><tr><th></th><th>Nachname</th><th>Vorname</th></tr>`;
       list.forEach((person, index) => {
-        table += `<tr>
+        table += `<tr data-id="${person.id}">
                         <td><input type="radio" class="personRadio" name="selectedPerson" data-index="${index}"></td>
                         <td onclick="selectPerson(${index})" style="cursor:pointer;">${person.lastname}</td>
                         <td onclick="selectPerson(${index})" style="cursor:pointer;">${person.firstname}</td>
@@ -76,9 +95,66 @@ function loadMembers(group) {
       memberList.innerHTML = table;
 
       memberList.dataset.members = JSON.stringify(list);
+      watchPresence(group);
     });
 }
 
+let presenceEvents = null;
+
+// Keep the marks up to date while the group is open: the server sends a
+// snapshot, then every change (also those made on other devices)
+function watchPresence(group) {
+  if (presenceEvents) {
+    presenceEvents.close();
+    presenceEvents = null;
+  }
+  if (!window.EventSource) {
+    markPresence(group);
+    return;
+  }
+  const events = new EventSource(`/api/presence/events?group=${encodeURIComponent(group)}`);
+  events.addEventListener("snapshot", (e) => {
+    applyPresence(JSON.parse(e.data).presence, true);
+  });
+  events.addEventListener("presence", (e) => {
+    const change = JSON.parse(e.data);
+    applyPresence({ [change.id]: change.state }, false);
+  });
+  events.addEventListener("error", () => {
+    // connection lost: the browser reconnects; refused (e.g. 503): load once
+    if (events.readyState === EventSource.CLOSED && presenceEvents === events) {
+      presenceEvents = null;
+      markPresence(group);
+    }
+  });
+  presenceEvents = events;
+}
+
+function markPresence(group) {
+  fetch(`/api/presence?group=${encodeURIComponent(group)}`)
+    .then((response) => response.json())
+    .then((data) => {
+      // another group may have been selected in the meantime
+      if (!data.presence || document.getElementById("groupSelect").value !== group) return;
+      applyPresence(data.presence, true);
+    })
+    .catch((error) => console.error(error));
+}
+
+// Mark the members whose newest entry is "ausgetreten"; with complete=false
+// only the rows contained in presence are updated
+function applyPresence(presence, complete) {
+  document.querySelectorAll("#memberList tr[data-id]").forEach((row) => {
+    if (!complete && !(row.dataset.id in presence)) return;
+    const state = presence[row.dataset.id];
+    const out = Boolean(state && state.status === "ausgetreten");
+    row.classList.toggle("out", out);
+    row.title = out
+      ? `ausgetreten um ${state.timestamp.slice(11, 16)} Uhr (${state.initials})`
+      : "";
+  });
+}
+
 function selectPerson(index) {
   const radio = document.querySelector(
     `input.personRadio[data-index="${index}"]`
@@ -171,6 +247,8 @@ function submitAction(actionType) {
             data.action +
             "\n";
         }
+        // with a live connection the change arrives as an event
+        if (!presenceEvents) markPresence(group);
       } else {
         document.getElementById("statusMsg").innerText =
           "Fehler: " + data.error;
@@ -0,0 +1,189 @@
+import os
+from abc import ABC, abstractmethod
+
+from event_writer import EventWriter, LOG_HEADER
+from edit_journal import EditJournal
+from lock_manager import LockManager
+from event_index import EventIndex, days_between
+from zip_stream import dir_members
+
+
+class Storage(ABC):
+    # Interface of the event stores behind the routes. Rows go in as
+    # (person_id, [values in LOG_HEADER order]) and come out as dicts keyed by
+    # LOG_HEADER. CsvStorage is the default, SqliteStorage (sqlite_storage.py)
+    # the alternative for large installations.
+    #
+    # Every read is ordered by timestamp, equal timestamps in the order they
+    # were written, whatever order appends and updates left the rows in.
+    # tests/test_storage.py runs against both backends.
+
+    @abstractmethod
+    def append(self, rows):
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, person_id):
+        # Is there a log for this person?
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_entries(self, person_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_days(self, person_id, days):
+        # Rows of the given dates ("YYYY-MM-DD")
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_page(self, person_id, limit, before=None, skip=0):
+        # Newest-first page and cursor ({"before", "skip"} or None), see EditJournal.read_page
+        raise NotImplementedError
+
+    def last_entry(self, person_id):
+        # Newest entry of a person, None if there is none
+        rows, _ = self.read_page(person_id, 1)
+        return rows[0] if rows else None
+
+    def last_entries(self):
+        # (person_id, newest entry) of every person; on CSV logs only the header
+        # and the last rows are read (and the days of pending journal edits)
+        for person_id in self.person_ids():
+            row = self.last_entry(person_id)
+            if row is not None:
+                yield person_id, row
+
+    @abstractmethod
+    def person_ids(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, person_id, target):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, person_id, orig, new):
+        raise NotImplementedError
+
+    @abstractmethod
+    def query_events(self, start, end, group=None, initials=None, status=None, limit=100, offset=0):
+        # Entries of all persons with start <= timestamp < end (timestamp
+        # strings), optionally filtered; ordered by time. Returns
+        # (rows, next_offset), next_offset is None on the last page.
+        raise NotImplementedError
+
+    @abstractmethod
+    def csv_path(self, person_id):
+        # Up-to-date CSV log of a person for exports and reports; the file
+        # doesn't exist if there are no entries
+        raise NotImplementedError
+
+    @abstractmethod
+    def archive_members(self):
+        # (arcname, source) of every person's log for stream_zip
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_all(self):
+        raise NotImplementedError
+
+    def lock_stats(self, reset=False):
+        return {}
+
+
+class CsvStorage(Storage):
+    # One CSV file per person (data/log/<id>.csv), edits in a journal,
+    # queries across persons via the day x group index in index_dir
+
+    def __init__(self, log_dir, journal_dir, lock_dir, index_dir):
+        self.log_dir = log_dir
+        self.journal_dir = journal_dir
+        self.index = EventIndex(index_dir)
+        # thread + flock() locks, safe with several worker processes
+        self.locks = LockManager(lock_dir=lock_dir, name="log")
+        self.event_writer = EventWriter(log_dir, locks=self.locks,
+                                        on_unsorted=lambda person_id: self.journal.mark_unsorted(person_id))
+        self.journal = EditJournal(log_dir, journal_dir, self.locks, self.event_writer)
+
+    def append(self, rows):
+        # postings first: a crash in between leaves at most a stale posting
+        # (harmless), never rows the index doesn't list
+        self.index.add([(values[6], values[1], person_id) for person_id, values in rows])
+        self.event_writer.append(rows)
+
+    def exists(self, person_id):
+        return os.path.exists(self.journal.log_path(person_id))
+
+    def read_entries(self, person_id):
+        return self.journal.read_entries(person_id)
+
+    def read_days(self, person_id, days):
+        return self.journal.read_days(person_id, days)
+
+    def read_page(self, person_id, limit, before=None, skip=0):
+        return self.journal.read_page(person_id, limit, before=before, skip=skip)
+
+    def delete(self, person_id, target):
+        # append a tombstone instead of rewriting the whole file
+        return self.journal.delete(person_id, target)
+
+    def update(self, person_id, orig, new):
+        # append a correction record instead of rewriting the whole file
+        # the entry may move to another day; posted first, like in append
+        self.index.add([(new["timestamp"], orig["group"], person_id)])
+        return self.journal.update(person_id, orig, new)
+
+    def query_events(self, start, end, group=None, initials=None, status=None, limit=100, offset=0):
+        if not self.index.is_complete():
+            self.index.rebuild((person_id, self.read_entries(person_id)) for person_id in self.person_ids())
+        # day by day in order, so the scan stops as soon as the page (and one
+        # row more, to know there is a next page) is complete
+        wanted = offset + limit
+        rows = []
+        for day in days_between(start, end):
+            day_rows = [
+                row
+                for person_id in self.index.persons(day, group)
+                for row in self.journal.read_days(person_id, {day})
+                if start <= row["timestamp"] < end
+                and (group is None or row["group"] == group)
+                and (initials is None or row["initials"] == initials)
+                and (status is None or row["status"] == status)
+            ]
+            day_rows.sort(key=lambda row: (row["timestamp"], row["id"]))
+            rows += day_rows
+            if len(rows) > wanted:
+                break
+        return rows[offset:wanted], (wanted if len(rows) > wanted else None)
+
+    def csv_path(self, person_id):
+        self.journal.compact(person_id)
+        return self.journal.log_path(person_id)
+
+    def archive_members(self):
+        self.journal.compact_all()
+        return dir_members(self.log_dir)
+
+    def delete_all(self):
+        with self.locks.write_all():
+            self.event_writer.close_all()
+            for directory in (self.log_dir, self.journal_dir):
+                if not os.path.isdir(directory):
+                    continue
+                for filename in os.listdir(directory):
+                    file_path = os.path.join(directory, filename)
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
+            self.index.clear()
+
+    def person_ids(self):
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sorted(filename[:-4] for filename in os.listdir(self.log_dir) if filename.endswith(".csv"))
+
+    def lock_stats(self, reset=False):
+        stats = self.locks.stats()
+        if reset:
+            self.locks.reset_stats()
+        return stats
@@ -0,0 +1,23 @@
+from event_index import EventIndex
+
+
+def test_postings_survive_a_clear_in_another_process(tmp_path):
+    # two instances on the same directory stand for two worker processes
+    writer, other = EventIndex(str(tmp_path)), EventIndex(str(tmp_path))
+    writer.add([("2026-10-01 08:00:00", "10a", "1")])
+    assert writer.persons("2026-10-01") == {"1": {"10a"}}
+
+    other.clear()
+    assert writer.persons("2026-10-01") == {}
+
+    # writer has written this posting before, but not since the clear
+    writer.add([("2026-10-01 09:00:00", "10a", "1")])
+    assert writer.persons("2026-10-01") == {"1": {"10a"}}
+
+
+def test_postings_are_written_once(tmp_path):
+    index = EventIndex(str(tmp_path))
+    index.add([("2026-10-01 08:00:00", "10a", "1"), ("2026-10-01 09:00:00", "10a", "1")])
+    index.add([("2026-10-01 10:00:00", "10a", "1")])
+    with open(tmp_path / "2026-10-01" / "10a.txt", encoding="utf-8") as f:
+        assert f.read() == "1\n"
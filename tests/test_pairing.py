@@ -0,0 +1,79 @@
+import random
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from pairing import pair_events
+
+EXIT, ENTRY = "ausgetreten", "eingetreten"
+
+
+def _old_pairs(df):
+    # the nested loop generate_report used before pair_events, as reference
+    valid_rows = []
+    used = set()
+    for i in range(len(df)):
+        if i in used:
+            continue
+        row = df.iloc[i]
+        if row['status'] == 'ausgetreten':
+            for j in range(i + 1, len(df)):
+                candidate = df.iloc[j]
+                if j in used:
+                    continue
+                if candidate['status'] == 'eingetreten':
+                    delta = candidate['timestamp'] - row['timestamp']
+                    if timedelta(0) < delta <= timedelta(minutes=20):
+                        valid_rows.append(row)
+                        valid_rows.append(candidate)
+                        used.add(i)
+                        used.add(j)
+                        break
+    pairs = [(valid_rows[i], valid_rows[i + 1]) for i in range(0, len(valid_rows), 2)]
+    return [(a.name, b.name, (b['timestamp'] - a['timestamp']).total_seconds()) for a, b in pairs]
+
+
+def _log(events):
+    # events: (status, minutes after 08:00), sorted like generate_report does
+    start = pd.Timestamp("2026-10-01 08:00:00")
+    df = pd.DataFrame({"status": [status for status, _ in events],
+                       "timestamp": [start + pd.Timedelta(minutes=minutes) for _, minutes in events]})
+    return df.sort_values(by="timestamp")
+
+
+def _new_pairs(df):
+    pairs = pair_events(df)
+    return list(zip(pairs["exit_index"].tolist(), pairs["entry_index"].tolist(), pairs["duration"].tolist()))
+
+
+@pytest.mark.parametrize("events", [
+    # equal timestamps
+    [(EXIT, 0), (ENTRY, 0)],
+    [(EXIT, 0), (EXIT, 0), (ENTRY, 5), (ENTRY, 5)],
+    [(ENTRY, 5), (EXIT, 5), (ENTRY, 5), (ENTRY, 6)],
+    # a gap of exactly 20 minutes, and just over it
+    [(EXIT, 0), (ENTRY, 20)],
+    [(EXIT, 0), (ENTRY, 20 + 1 / 60)],
+    [(EXIT, 0), (EXIT, 1), (ENTRY, 20), (ENTRY, 21)],
+    # zero delta next to a valid entry
+    [(EXIT, 3), (ENTRY, 3), (ENTRY, 4)],
+    # consecutive events with the same status
+    [(EXIT, 0), (EXIT, 2), (EXIT, 4), (ENTRY, 6), (ENTRY, 8)],
+    [(ENTRY, 0), (ENTRY, 1), (EXIT, 2), (ENTRY, 3), (ENTRY, 4)],
+    [(EXIT, 0), (EXIT, 30), (ENTRY, 31), (ENTRY, 32)],
+    [],
+])
+def test_pairs_match_the_previous_loop(events):
+    df = _log(events)
+    assert _new_pairs(df) == _old_pairs(df)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_logs_match_the_previous_loop(seed):
+    rng = random.Random(seed)
+    # few distinct minutes, so equal timestamps and 20-minute gaps are common
+    events = [(rng.choice([EXIT, ENTRY, "unbekannt"]), rng.choice([0, 5, 10, 20, 25, 40]) + rng.randrange(4) * 20)
+              for _ in range(rng.randrange(1, 30))]
+    df = _log(events)
+    assert _new_pairs(df) == _old_pairs(df)
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from presence import PresenceMap
+
+
+def row(status, timestamp):
+    return {"status": status, "timestamp": timestamp, "initials": "AB", "group": "10a"}
+
+
+def presence_map(tmp_path, load):
+    return PresenceMap(str(tmp_path / "presence" / "feed"), str(tmp_path / "locks" / "presence.lock"), load)
+
+
+def test_concurrent_first_use_builds_once(tmp_path):
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        yield "1", row("eingetreten", "2026-10-01 08:00:00")
+
+    presence = presence_map(tmp_path, load)
+    threads = [threading.Thread(target=presence.get, args=(["1"],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+
+def test_changes_reach_every_map(tmp_path):
+    # two maps on the same feed stand for two worker processes; `stored` for
+    # the entries in the storage, which the routes update before publishing
+    stored = {"1": row("eingetreten", "2026-10-01 08:00:00")}
+    first = presence_map(tmp_path, lambda: list(stored.items()))
+    second = presence_map(tmp_path, lambda: list(stored.items()))
+    assert second.get(["1"])["1"]["status"] == "eingetreten"
+
+    stored.update({"1": row("ausgetreten", "2026-10-01 09:00:00"), "2": row("eingetreten", "2026-10-01 09:00:00")})
+    first.publish([("1", stored["1"]), ("2", stored["2"])])
+    assert second.get(["1", "2"]) == stored
+    assert first.get(["1", "2"]) == stored
+
+    del stored["2"]
+    second.publish([("2", None)])
+    assert first.get(["1", "2"]) == {"1": row("ausgetreten", "2026-10-01 09:00:00")}
+
+    stored.clear()
+    first.clear()
+    assert second.get(["1"]) == {}
+
+
+def test_publishing_never_rebuilds(tmp_path):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return iter([])
+
+    presence = presence_map(tmp_path, load)
+    presence.publish([("1", row("eingetreten", "2026-10-01 08:00:00"))])
+    assert loads == []
+    presence.sync()
+    presence.publish([("1", row("ausgetreten", "2026-10-01 09:00:00"))])
+    assert loads == [1]
@@ -0,0 +1,223 @@
+import csv
+import io
+import os
+
+import pytest
+
+from storage import Storage, CsvStorage, LOG_HEADER
+from sqlite_storage import SqliteStorage
+
+
+# The same behaviour is expected of every backend: the routes don't know
+# which one they talk to.
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "csv":
+        store = CsvStorage(str(tmp_path / "log"), str(tmp_path / "journal"),
+                           str(tmp_path / "locks"), str(tmp_path / "index"))
+        yield store
+        store.event_writer.close_all()
+    else:
+        yield SqliteStorage(str(tmp_path / "presence.db"), str(tmp_path / "export"))
+
+
+def entry(person_id, timestamp, status="eingetreten", group="10a", initials="AB"):
+    return {"initials": initials, "group": group, "id": person_id, "lastname": f"Name-{person_id}",
+            "firstname": "Vorname", "status": status, "timestamp": timestamp}
+
+
+def add(storage, *entries):
+    storage.append([(e["id"], [e[field] for field in LOG_HEADER]) for e in entries])
+
+
+def timestamps(rows):
+    return [row["timestamp"] for row in rows]
+
+
+def all_pages(storage, person_id, limit):
+    rows, cursor = storage.read_page(person_id, limit)
+    while cursor is not None:
+        page, cursor = storage.read_page(person_id, limit, **cursor)
+        rows += page
+    return rows
+
+
+def test_append_and_read_entries(storage):
+    first, second = entry("1", "2026-10-01 08:00:00"), entry("1", "2026-10-01 09:30:00", "ausgetreten")
+    add(storage, first, second, entry("2", "2026-10-01 08:05:00"))
+
+    assert storage.read_entries("1") == [first, second]
+    assert storage.exists("1")
+    assert not storage.exists("3")
+    assert storage.read_entries("3") == []
+    assert storage.person_ids() == ["1", "2"]
+
+
+def test_read_days(storage):
+    add(storage, entry("1", "2026-10-01 08:00:00"), entry("1", "2026-10-02 08:00:00"),
+        entry("1", "2026-10-03 08:00:00"))
+
+    assert timestamps(storage.read_days("1", {"2026-10-01", "2026-10-03"})) == \
+        ["2026-10-01 08:00:00", "2026-10-03 08:00:00"]
+    assert storage.read_days("1", {"2026-09-30"}) == []
+
+
+def test_read_page_walks_all_entries_newest_first(storage):
+    # equal timestamps have to be split across pages without loss
+    stamps = ["2026-10-01 08:00:00", "2026-10-01 09:00:00", "2026-10-01 09:00:00",
+              "2026-10-01 09:00:00", "2026-10-02 07:00:00", "2026-10-03 12:00:00"]
+    add(storage, *(entry("1", ts, status) for ts, status in zip(stamps, ["eingetreten", "ausgetreten"] * 3)))
+
+    expected = storage.read_entries("1")[::-1]
+    for limit in (1, 2, 3, 4, 10):
+        assert all_pages(storage, "1", limit) == expected
+    assert storage.read_page("1", 10) == (expected, None)
+    assert storage.read_page("2", 10) == ([], None)
+
+
+def test_late_appends_are_read_in_order(storage):
+    # entries may arrive older than the newest one (clock skew, worker races)
+    stamps = ["2026-10-01 10:00:00", "2026-10-03 12:00:00", "2026-10-02 11:00:00", "2026-10-03 08:00:00",
+              "2026-10-04 07:00:00", "2026-10-01 09:00:00"]
+    for timestamp in stamps:
+        add(storage, entry("1", timestamp))
+
+    assert timestamps(storage.read_entries("1")) == sorted(stamps)
+    for limit in (1, 2, 4):
+        assert timestamps(all_pages(storage, "1", limit)) == sorted(stamps, reverse=True)
+    assert storage.last_entry("1")["timestamp"] == "2026-10-04 07:00:00"
+
+
+def test_delete(storage):
+    keep, gone = entry("1", "2026-10-01 08:00:00"), entry("1", "2026-10-01 09:00:00", "ausgetreten")
+    add(storage, keep, gone)
+
+    assert storage.delete("1", gone)
+    assert not storage.delete("1", gone)
+    assert storage.read_entries("1") == [keep]
+    assert storage.last_entry("1") == keep
+
+
+def test_edits_only_apply_to_earlier_entries(storage):
+    # an identical entry appended after a delete/update is a new entry
+    first = entry("1", "2026-10-01 08:00:00")
+    add(storage, first)
+    assert storage.delete("1", first)
+    add(storage, first)
+
+    assert storage.read_entries("1") == [first]
+    assert storage.last_entry("1") == first
+    assert storage.read_days("1", {"2026-10-01"}) == [first]
+
+    moved = dict(first, timestamp="2026-10-01 09:00:00")
+    assert storage.update("1", first, moved)
+    add(storage, first)
+    assert storage.read_entries("1") == [first, moved]
+    assert all_pages(storage, "1", 1) == [moved, first]
+
+
+def test_update_keeps_every_read_ordered_by_timestamp(storage):
+    # a correction moving an entry past later ones must not leave the
+    # backends disagreeing about which entry is the newest
+    early, middle, late = (entry("1", "2026-10-01 08:00:00"),
+                           entry("1", "2026-10-01 10:00:00", "ausgetreten"),
+                           entry("1", "2026-10-01 12:00:00"))
+    add(storage, early, middle, late)
+
+    moved = dict(early, status="ausgetreten", timestamp="2026-10-01 23:59:00")
+    assert storage.update("1", early, moved)
+    assert not storage.update("1", early, moved)
+
+    assert storage.read_entries("1") == [middle, late, moved]
+    assert storage.last_entry("1") == moved
+    assert dict(storage.last_entries())["1"] == moved
+    assert all_pages(storage, "1", 1) == [moved, late, middle]
+    assert storage.read_days("1", {"2026-10-01"}) == [middle, late, moved]
+
+
+def test_update_to_another_day(storage):
+    original = entry("1", "2026-10-01 08:00:00")
+    add(storage, original)
+    moved = dict(original, timestamp="2026-10-05 08:00:00")
+    assert storage.update("1", original, moved)
+
+    assert storage.read_days("1", {"2026-10-01"}) == []
+    assert storage.read_days("1", {"2026-10-05"}) == [moved]
+    assert storage.query_events("2026-10-05", "2026-10-06") == ([moved], None)
+
+
+def test_last_entries(storage):
+    add(storage, entry("1", "2026-10-01 08:00:00"), entry("1", "2026-10-01 09:00:00", "ausgetreten"),
+        entry("2", "2026-10-01 08:30:00"))
+
+    last = dict(storage.last_entries())
+    assert timestamps([last["1"], last["2"]]) == ["2026-10-01 09:00:00", "2026-10-01 08:30:00"]
+    assert storage.last_entry("3") is None
+
+
+def test_query_events(storage):
+    add(storage,
+        entry("2", "2026-10-01 08:00:00"),
+        entry("1", "2026-10-01 08:00:00"),
+        entry("1", "2026-10-01 10:00:00", "ausgetreten"),
+        entry("3", "2026-10-01 09:00:00", group="10b", initials="CD"),
+        entry("2", "2026-10-02 08:00:00", "ausgetreten"),
+        entry("1", "2026-10-03 08:00:00"))
+
+    rows, next_offset = storage.query_events("2026-10-01", "2026-10-03")
+    assert [(row["timestamp"], row["id"]) for row in rows] == [
+        ("2026-10-01 08:00:00", "1"), ("2026-10-01 08:00:00", "2"), ("2026-10-01 09:00:00", "3"),
+        ("2026-10-01 10:00:00", "1"), ("2026-10-02 08:00:00", "2")]
+    assert next_offset is None
+
+    assert [row["id"] for row in storage.query_events("2026-10-01", "2026-10-04", group="10b")[0]] == ["3"]
+    assert [row["id"] for row in storage.query_events("2026-10-01", "2026-10-04", initials="CD")[0]] == ["3"]
+    assert len(storage.query_events("2026-10-01", "2026-10-04", status="ausgetreten")[0]) == 2
+    assert storage.query_events("2026-10-01 08:30:00", "2026-10-01 10:00:00")[0] == \
+        [entry("3", "2026-10-01 09:00:00", group="10b", initials="CD")]
+
+    paged, offset = [], 0
+    while offset is not None:
+        page, offset = storage.query_events("2026-10-01", "2026-10-04", limit=2, offset=offset)
+        assert len(page) <= 2
+        paged += page
+    assert paged == storage.query_events("2026-10-01", "2026-10-04")[0]
+
+
+def test_csv_path_and_archive_members(storage):
+    first, second = entry("1", "2026-10-01 08:00:00"), entry("1", "2026-10-01 09:00:00", "ausgetreten")
+    add(storage, second, first)  # out of order
+    assert storage.delete("1", second)
+
+    with open(storage.csv_path("1"), newline="", encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == [first]
+    assert not os.path.exists(storage.csv_path("2"))
+
+    members = dict(storage.archive_members())
+    assert list(members) == ["1.csv"]
+    source = members["1.csv"]
+    if isinstance(source, bytes):
+        rows = list(csv.DictReader(io.StringIO(source.decode("utf-8"))))
+    else:
+        with open(source, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    assert rows == [first]
+
+
+def test_delete_all(storage):
+    add(storage, entry("1", "2026-10-01 08:00:00"), entry("2", "2026-10-01 08:00:00"))
+    storage.delete_all()
+
+    assert storage.person_ids() == []
+    assert storage.read_entries("1") == []
+    assert list(storage.last_entries()) == []
+    assert storage.query_events("2026-10-01", "2026-10-02") == ([], None)
+
+    add(storage, entry("1", "2026-10-01 09:00:00"))
+    assert timestamps(storage.query_events("2026-10-01", "2026-10-02")[0]) == ["2026-10-01 09:00:00"]
+
+
+def test_backends_implement_the_whole_interface():
+    with pytest.raises(TypeError):
+        Storage()
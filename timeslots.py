@@ -0,0 +1,60 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+
+def _to_minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class TimeslotTable:
+    # Parsed timeslot definition ("slot,HH:MM,HH:MM" per line) with the
+    # lookup arrays for assigning timestamps to slots. Slots must not overlap.
+
+    def __init__(self, rows):
+        self.slots = [slot for slot, _, _ in rows]  # in file order
+        self.labels = {slot: f"{slot}: {start}-{end}" for slot, start, end in rows}
+
+        by_start = sorted(rows, key=lambda r: _to_minutes(r[1]))
+        self._starts = np.array([_to_minutes(start) for _, start, _ in by_start])
+        self._ends = np.array([_to_minutes(end) for _, _, end in by_start])
+        self._sorted_slots = np.array([slot for slot, _, _ in by_start] + [None], dtype=object)
+
+    @classmethod
+    def from_file(cls, path):
+        rows = []
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.strip().split(',')
+                if len(parts) < 3:
+                    continue  # blank lines
+                rows.append((parts[0], parts[1], parts[2]))
+        return cls(rows)
+
+    def assign(self, timestamps):
+        # Slot of every timestamp (start <= time < end), None outside of all slots
+        timestamps = pd.Series(timestamps)
+        minutes = (timestamps.dt.hour * 60 + timestamps.dt.minute).to_numpy()
+        idx = np.searchsorted(self._starts, minutes, side="right") - 1
+        inside = (idx >= 0) & (minutes < self._ends[np.maximum(idx, 0)])
+        idx[~inside] = -1  # -> trailing None
+        return pd.Series(self._sorted_slots[idx], index=timestamps.index)
+
+
+_cache = {}  # path -> (mtime_ns, TimeslotTable)
+_cache_lock = threading.Lock()
+
+
+def load_timeslots(path):
+    # Parsed once per process, reloaded when the file changes
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+    table = TimeslotTable.from_file(path)
+    with _cache_lock:
+        _cache[path] = (mtime_ns, table)
+    return table
@@ -0,0 +1,158 @@
+import os
+import time
+import zlib
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 64 * 1024  # small members are sent together
+COMPRESSION_LEVEL = 6  # zlib level 1-9, 0 or "store" for no compression
+# already compressed, deflating them again only costs time
+STORED_EXTENSIONS = {".zip", ".gz", ".bz2", ".xz", ".7z", ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".xlsx", ".docx", ".odt", ".ods"}
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+_STORED, _DEFLATED = 0, 8
+
+
+def dir_members(dir):
+    # (arcname, path) of every file and empty folder below dir
+    for foldername, subfolders, filenames in os.walk(dir):
+        if not filenames and not subfolders:  # empty folders
+            yield os.path.relpath(foldername, dir) + '/', foldername
+        for filename in filenames:  # files
+            file_path = os.path.join(foldername, filename)
+            yield os.path.relpath(file_path, dir), file_path
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    return (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday, t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+
+class _Member:
+    __slots__ = ("name", "method", "crc", "size", "payload", "compressed_size", "mtime", "mode", "offset")
+
+
+def _prepare(arcname, source, level):
+    # Runs in the pool: read and compress one member (zlib releases the GIL)
+    m = _Member()
+    m.name = arcname.replace(os.sep, "/")
+    if isinstance(source, bytes):
+        data, m.mtime, m.mode = source, time.time(), 0o100644
+    elif os.path.isdir(source):
+        st = os.stat(source)
+        data, m.mtime, m.mode = b"", st.st_mtime, st.st_mode
+        if not m.name.endswith("/"):
+            m.name += "/"
+    else:
+        with open(source, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        m.mtime, m.mode = st.st_mtime, st.st_mode
+
+    m.crc = zlib.crc32(data)
+    m.size = len(data)
+    store = (level == "store" or level == 0 or not data
+             or os.path.splitext(m.name)[1].lower() in STORED_EXTENSIONS)
+    if store:
+        m.method, m.payload = _STORED, data
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)  # raw deflate
+        m.method, m.payload = _DEFLATED, compressor.compress(data) + compressor.flush()
+    return m
+
+
+class _ZipWriter:
+    # Writes prepared members one after another. Sizes and CRC are known
+    # before a member is written, so the local headers are final and nothing
+    # has to be patched later: the output can be streamed as it is produced.
+
+    def __init__(self):
+        self.members = []
+        self.pos = 0
+
+    def _flags(self, m):
+        try:
+            m.name.encode("ascii")
+            return 0
+        except UnicodeEncodeError:
+            return 0x800  # utf-8 names
+
+    def add(self, m):
+        m.offset = self.pos
+        name = m.name.encode("utf-8")
+        date, clock = _dos_datetime(m.mtime)
+        zip64 = m.size >= ZIP64_LIMIT or len(m.payload) >= ZIP64_LIMIT
+        extra = struct.pack("<HHQQ", 1, 16, m.size, len(m.payload)) if zip64 else b""
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if zip64 else 20, self._flags(m), m.method, clock, date, m.crc,
+            ZIP64_LIMIT if zip64 else len(m.payload), ZIP64_LIMIT if zip64 else m.size, len(name), len(extra))
+        data = header + name + extra + m.payload
+        self.pos += len(data)
+        m.compressed_size = len(m.payload)
+        m.payload = None  # written, don't keep it around
+        self.members.append(m)
+        return data
+
+    def finish(self):
+        central = []
+        for m in self.members:
+            name = m.name.encode("utf-8")
+            date, clock = _dos_datetime(m.mtime)
+            compressed = m.compressed_size
+            zip64_fields = [v for v in (m.size, compressed) if max(m.size, compressed) >= ZIP64_LIMIT]
+            if m.offset >= ZIP64_LIMIT:
+                zip64_fields.append(m.offset)
+            extra = struct.pack("<HH" + "Q" * len(zip64_fields), 1, 8 * len(zip64_fields), *zip64_fields) if zip64_fields else b""
+            external = (m.mode & 0xFFFF) << 16 | (0x10 if m.name.endswith("/") else 0)
+            central.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, 3 << 8 | 45, 45 if extra else 20, self._flags(m), m.method,
+                clock, date, m.crc,
+                ZIP64_LIMIT if max(m.size, compressed) >= ZIP64_LIMIT else compressed,
+                ZIP64_LIMIT if max(m.size, compressed) >= ZIP64_LIMIT else m.size,
+                len(name), len(extra), 0, 0, 0, external,
+                ZIP64_LIMIT if m.offset >= ZIP64_LIMIT else m.offset) + name + extra)
+        central = b"".join(central)
+        start, count = self.pos, len(self.members)
+
+        end = b""
+        if count >= ZIP64_COUNT_LIMIT or start >= ZIP64_LIMIT or len(central) >= ZIP64_LIMIT:
+            zip64_end = start + len(central)
+            end += struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, len(central), start)
+            end += struct.pack("<IIQI", 0x07064B50, 0, zip64_end, 1)
+        end += struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+                           min(len(central), ZIP64_LIMIT), min(start, ZIP64_LIMIT), 0)
+        return central + end
+
+
+def _ordered(members, level, workers):
+    # prepared members in their given order, at most a few per worker in memory
+    window = workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(workers, thread_name_prefix="zip") as pool:
+        for arcname, source in members:
+            pending.append(pool.submit(_prepare, arcname, source, level))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_zip(members, level=COMPRESSION_LEVEL, workers=None, chunk_size=CHUNK_SIZE):
+    # Generator with the bytes of a ZIP archive of `members`: (arcname, source)
+    # pairs, source being a file/folder path or bytes. Members are read and
+    # deflated concurrently in a thread pool and written in their given order.
+    writer = _ZipWriter()
+    chunk = []
+    buffered = 0
+    for member in _ordered(members, level, workers or os.cpu_count() or 1):
+        data = writer.add(member)
+        chunk.append(data)
+        buffered += len(data)
+        if buffered >= chunk_size:
+            yield b"".join(chunk)
+            chunk, buffered = [], 0
+    chunk.append(writer.finish())
+    yield b"".join(chunk)